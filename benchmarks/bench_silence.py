@@ -0,0 +1,73 @@
+"""
+Compares the vectorized beat_silence_mask against the original per-beat loop
+on multi-minute stereo stems, checking both give the same mask.
+
+Run from the repository root:
+    python -m benchmarks.bench_silence
+"""
+import time
+import numpy as np
+from frankenstem.analysis import beat_silence_mask
+
+
+def loop_silence_mask(audio, beat_boundaries, sr, silence_thresh_db=-40):
+    """
+    The original implementation: a Python list of 100 ms subwindows per beat.
+    """
+    keep = []
+    subwindow_size = int(sr * 0.1)
+
+    for i in range(len(beat_boundaries) - 1):
+        segment = audio[:, beat_boundaries[i]:beat_boundaries[i + 1]]
+        subwindows = [segment[:, j:j + subwindow_size] for j in range(0, segment.shape[1], subwindow_size)]
+        peak_amplitudes = [np.max(np.abs(subwindow)) for subwindow in subwindows if subwindow.shape[1] > 0]
+
+        if peak_amplitudes:
+            peak_db = 20 * np.log10(np.max(peak_amplitudes) + 1e-6)
+        else:
+            peak_db = -np.inf
+        keep.append(peak_db > silence_thresh_db)
+
+    return np.array(keep, dtype=bool)
+
+
+def make_stem(minutes, sr, bpm, seed=0):
+    """
+    Stereo noise at a level that straddles the -40 dB threshold, with silent gaps.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(minutes * 60 * sr)
+    audio = (rng.standard_normal((2, n)) * 0.003).astype(np.float32)
+    beat_length = int(sr * 60 / bpm)
+    gains = rng.choice([0.0, 0.5, 1.0, 20.0], size=n // beat_length + 1)
+    audio *= np.repeat(gains, beat_length)[:n]
+    beat_boundaries = np.arange(0, n, beat_length, dtype=np.int64)
+    return audio, beat_boundaries
+
+
+def best_of(function, repeats, *args):
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(sr=44100, repeats=3):
+    print(f"{'bpm':>5} {'minutes':>8} {'beats':>6} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>8}")
+    for bpm in (120, 320):
+        for minutes in (1, 3, 6, 10):
+            audio, beat_boundaries = make_stem(minutes, sr, bpm)
+            loop_time, expected = best_of(loop_silence_mask, repeats, audio, beat_boundaries, sr)
+            vector_time, mask = best_of(beat_silence_mask, repeats, audio, beat_boundaries, sr)
+
+            if not np.array_equal(expected, mask):
+                raise AssertionError(f"Masks differ for a {minutes} minute stem at {bpm} BPM")
+
+            print(f"{bpm:>5} {minutes:>8} {len(beat_boundaries) - 1:>6} {loop_time:>10.4f} "
+                  f"{vector_time:>15.4f} {loop_time / vector_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Times each pipeline stage separately on synthetic stem folders and reports scaling
+curves over song count and stem duration, with peak traced memory per stage.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --songs 2 4 8 16 --durations 30 60 --json results.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from benchmarks.synth import make_stem_folder, synth_stem
+from frankenstem.analysis import analyze_stem
+from frankenstem.audio_io import load_audio
+from frankenstem.classes import StemType
+from frankenstem.combiner import combine_segments
+from frankenstem.config import FrankenstemConfig
+from frankenstem.energy_filter import filter_segments_by_energy
+from frankenstem.export import write_segments
+from frankenstem.filename_parser import load_wavs_from_folder
+from frankenstem.pipeline import StemLibrary, render
+from frankenstem.removing_silence import remove_silence
+from frankenstem.segment_index import SegmentDescriptor
+from frankenstem.splicer import slice_into_random_beats, slice_by_transients
+
+STAGES = (
+    "load_audio",
+    "analyze_stem",
+    "remove_silence",
+    "slice_into_random_beats",
+    "slice_by_transients",
+    "filter_segments_by_energy",
+    "combine_segments",
+    "export",
+    "render"  # the whole pipeline: folder scan, analysis, slicing, selection and export
+)
+RENDER_SECONDS = 20
+
+
+class StageTimer:
+    """
+    Accumulates wall time and the highest traced peak memory per stage.
+    """
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.peak_mb = dict.fromkeys(STAGES, 0.0)
+
+    def run(self, stage, function, *args, **kwargs):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.seconds[stage] += time.perf_counter() - start
+        peak = (tracemalloc.get_traced_memory()[1] - baseline) / 1e6
+        self.peak_mb[stage] = max(self.peak_mb[stage], peak)
+        return result
+
+
+def bench_folder(folder, bpm, output_dir):
+    timer = StageTimer()
+    songs = load_wavs_from_folder(folder)
+    beat_segments = []
+    transient_segments = []
+    descriptors = []
+    sr = None
+
+    for song in songs:
+        for stem in song.stems.values():
+            audio, sr = timer.run("load_audio", load_audio, stem.filepath)
+            # analyzed once and shared, like the pipeline does
+            analysis = timer.run("analyze_stem", analyze_stem, audio, sr, bpm)
+            timer.run("remove_silence", remove_silence, audio, sr, bpm, analysis=analysis)
+            segments = timer.run("slice_into_random_beats", slice_into_random_beats, audio, sr, bpm, 2, 4, analysis=analysis)
+            beat_segments.extend(segments)
+            transient_segments.extend(
+                timer.run("slice_by_transients", slice_by_transients, audio, sr, bpm, analysis=analysis)
+            )
+            descriptors.append(SegmentDescriptor(stem, 0, audio.shape[-1]))
+
+    timer.run("filter_segments_by_energy", filter_segments_by_energy, beat_segments, "medium")
+    if transient_segments:
+        timer.run("combine_segments", combine_segments, beat_segments, transient_segments, sr=sr)
+    timer.run("export", write_segments, os.path.join(output_dir, "export.wav"), descriptors, sr)
+
+    config = FrankenstemConfig(
+        target_duration=RENDER_SECONDS, bpm=bpm, selected_stem_types=list(StemType),
+        selected_slicing_function=slice_into_random_beats, min_beats=2, max_beats=4, seed=0
+    )
+    timer.run("render", lambda: render(StemLibrary.from_folder(folder, config), config, os.path.join(output_dir, "render")))
+    return timer
+
+
+def warm_up(sr, bpm):
+    # numba compiles librosa's beat tracker on first use, keep that out of the timings
+    audio = synth_stem(5, sr=sr, bpm=bpm)
+    slice_into_random_beats(audio, sr, bpm, 2, 4)
+    slice_by_transients(audio, sr, bpm)
+
+
+def print_curve(title, x_label, rows, x_key):
+    print(f"\n{title}")
+    print(f"{x_label:>10} " + " ".join(f"{stage[:14]:>15}" for stage in STAGES))
+    for row in rows:
+        print(f"{row[x_key]:>10} " + " ".join(f"{row['seconds'][stage]:>14.3f}s" for stage in STAGES))
+    print(f"{'peak MB':>10}")
+    for row in rows:
+        print(f"{row[x_key]:>10} " + " ".join(f"{row['peak_mb'][stage]:>14.1f} " for stage in STAGES))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--songs", type=int, nargs="+", default=[2, 4, 8], help="song counts for the song-count curve")
+    parser.add_argument("--durations", type=float, nargs="+", default=[15, 30, 60], help="stem lengths (s) for the duration curve")
+    parser.add_argument("--fixed-songs", type=int, default=2, help="song count used for the duration curve")
+    parser.add_argument("--fixed-duration", type=float, default=20, help="stem length (s) used for the song-count curve")
+    parser.add_argument("--channels", type=int, default=2, choices=[1, 2])
+    parser.add_argument("--sr", type=int, default=44100)
+    parser.add_argument("--bpm", type=float, default=120)
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    warm_up(args.sr, args.bpm)
+    tracemalloc.start()
+    results = {"songs": [], "durations": []}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_songs in args.songs:
+            folder = make_stem_folder(os.path.join(tmp, f"songs_{n_songs}"), n_songs, args.fixed_duration,
+                                      sr=args.sr, bpm=args.bpm, channels=args.channels)
+            timer = bench_folder(folder, args.bpm, tmp)
+            results["songs"].append({"songs": n_songs, "seconds": timer.seconds, "peak_mb": timer.peak_mb})
+
+        for seconds in args.durations:
+            folder = make_stem_folder(os.path.join(tmp, f"duration_{seconds:g}"), args.fixed_songs, seconds,
+                                      sr=args.sr, bpm=args.bpm, channels=args.channels)
+            timer = bench_folder(folder, args.bpm, tmp)
+            results["durations"].append({"duration": seconds, "seconds": timer.seconds, "peak_mb": timer.peak_mb})
+
+    tracemalloc.stop()
+
+    print_curve(f"Scaling over song count ({args.fixed_duration:g} s stems, 4 stems per song)", "songs",
+                results["songs"], "songs")
+    print_curve(f"Scaling over stem duration ({args.fixed_songs} songs, 4 stems per song)", "duration",
+                results["durations"], "duration")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
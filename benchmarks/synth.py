@@ -0,0 +1,49 @@
+"""
+Deterministic synthetic stem folders for benchmarking: click tracks and noise at a
+known BPM, named the way filename_parser.parse_filename expects.
+"""
+import os
+import numpy as np
+import soundfile as sf
+
+STEM_NAMES = ("Vocals", "Drums", "Bass", "Other")
+
+
+def synth_stem(seconds, sr=44100, bpm=120, channels=2, seed=0, silence_every=8):
+    """
+    A decaying click on every beat over low-level noise, with every silence_every-th
+    bar left silent so silence removal has something to do.
+
+    Returns: float32 array, (channels, n) for stereo or (n,) for mono
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    beat_length = int(sr * 60 / bpm)
+
+    mono = 0.01 * rng.standard_normal(n)
+    t = np.arange(beat_length) / sr
+    pitch = rng.uniform(80, 1000)
+    click = np.sin(2 * np.pi * pitch * t) * np.exp(-t * 20)
+    for beat, start in enumerate(range(0, n - beat_length, beat_length)):
+        mono[start:start + beat_length] += rng.uniform(0.3, 0.9) * click
+        if silence_every and (beat // 4) % silence_every == silence_every - 1:
+            mono[start:start + beat_length] = 0.0
+
+    if channels == 1:
+        return mono.astype(np.float32)
+    gains = np.linspace(1.0, 0.8, channels)[:, np.newaxis]
+    return (gains * mono).astype(np.float32)
+
+
+def make_stem_folder(folder, n_songs, seconds, sr=44100, bpm=120, channels=2, stem_names=STEM_NAMES):
+    """
+    Writes n_songs songs with one stem per name into folder, e.g. "Song 001 (Drums).wav".
+    Existing files with the same name are overwritten. Returns the folder.
+    """
+    os.makedirs(folder, exist_ok=True)
+    for song in range(n_songs):
+        for i, stem_name in enumerate(stem_names):
+            audio = synth_stem(seconds, sr=sr, bpm=bpm, channels=channels, seed=song * len(stem_names) + i)
+            path = os.path.join(folder, f"Song {song + 1:03d} ({stem_name}).wav")
+            sf.write(path, audio.T if audio.ndim == 2 else audio, sr)
+    return folder
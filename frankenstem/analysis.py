@@ -0,0 +1,637 @@
+from dataclasses import dataclass
+import numpy as np
+from frankenstem.instrumentation import NullProfiler
+
+# librosa (and through it numba and scipy) is imported by the functions that use it, so
+# importing frankenstem stays fast for commands that never analyze audio
+
+ANALYSIS_VERSION = 5  # bump when the cached arrays change
+BEAT_MODES = ("track", "grid")
+GRID_DRIFT_TOLERANCE = 1 / 16  # warn when onsets drift this many beats away from the grid
+GRID_ANALYSIS_SR = 11025  # grid phase and drift only need a decimated envelope, see analyze_song
+N_MFCC = 13
+N_FEATURES = N_MFCC + 12 + 1  # MFCCs, chroma, spectral centroid
+
+
+@dataclass
+class StemAnalysis:
+    """
+    Results of the single analysis pass over one stem, shared by silence removal,
+    both slicers and the energy filter. All positions are in samples of the source audio.
+    """
+    sr: int
+    n_samples: int
+    beat_samples: np.ndarray  # beat boundaries
+    keep: np.ndarray  # one bool per beat span, False where the span is silent
+    onset_envelope: np.ndarray
+    energy_prefix: np.ndarray  # running sum of squared mono samples at every hop_length frame boundary
+    hop_length: int = 512
+    feature_prefix: np.ndarray | None = None  # running sums of per-frame spectral features, see _frame_features
+
+    @property
+    def non_silent_spans(self):
+        """
+        (start, end) sample spans of the non-silent beats, as an int64 array of shape (n, 2).
+        """
+        starts = self.beat_samples[:-1][self.keep]
+        ends = self.beat_samples[1:][self.keep]
+        return np.stack([starts, ends], axis=1).astype(np.int64)
+
+    def non_silent_runs(self):
+        """
+        Splits the beat grid into runs of consecutive non-silent beats.
+        Returns a list of beat boundary arrays, one per run.
+        """
+        runs = []
+        run_start = None
+        for i, kept in enumerate(self.keep):
+            if kept and run_start is None:
+                run_start = i
+            elif not kept and run_start is not None:
+                runs.append(self.beat_samples[run_start:i + 1])
+                run_start = None
+        if run_start is not None:
+            runs.append(self.beat_samples[run_start:len(self.keep) + 1])
+        return runs
+
+    def onset_samples(self, delta=0.05, backtrack=True):
+        """
+        Peak-picks onsets from the shared onset envelope.
+        """
+        import librosa
+        onset_frames = librosa.onset.onset_detect(
+            onset_envelope=self.onset_envelope,
+            sr=self.sr,
+            hop_length=self.hop_length,
+            backtrack=backtrack,
+            delta=delta
+        )
+        return librosa.frames_to_samples(onset_frames, hop_length=self.hop_length)
+
+    def segment_energy(self, start, end):
+        """
+        RMS energy of the mono mix between two sample positions.
+        """
+        return self.segment_energies(np.array([start]), np.array([end]))[0]
+
+    def segment_energies(self, starts, ends):
+        """
+        RMS energies of many [start, end) segments at once, O(1) each from the prefix sums.
+        Exact for hop-aligned positions, which all beat and onset boundaries are.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        first_frame = starts // self.hop_length
+        last_frame = np.minimum(-(-ends // self.hop_length), len(self.energy_prefix) - 1)  # ceil
+        lengths = np.maximum(ends - starts, 1)
+        total = np.maximum(self.energy_prefix[last_frame] - self.energy_prefix[first_frame], 0.0)
+        return np.where(ends > starts, np.sqrt(total / lengths), 0.0)
+
+    def segment_features(self, starts, ends):
+        """
+        Mean spectral features (MFCCs, chroma, centroid) of many [start, end) segments
+        at once, O(1) each from the feature prefix sums.
+
+        Returns: float32 array of shape (len(starts), N_FEATURES), or None when the
+        analysis was run without features
+        """
+        if self.feature_prefix is None:
+            return None
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        first_frame = np.minimum(starts // self.hop_length, len(self.feature_prefix) - 2)
+        last_frame = np.clip(-(-ends // self.hop_length), first_frame + 1, len(self.feature_prefix) - 1)
+        total = self.feature_prefix[last_frame] - self.feature_prefix[first_frame]
+        return (total / (last_frame - first_frame)[:, np.newaxis]).astype(np.float32)
+
+
+def analyze_stem(audio, sr, bpm, silence_thresh_db=-40, hop_length=512, cache=None, profiler=None,
+                 beat_mode="track", check_drift=True, analysis_sr=None, features=False, onsets=True):
+    """
+    Computes the mono mix, onset envelope, beat grid and silence mask of a stem in one pass.
+    A single-stem analyze_song.
+
+    Parameters:
+    - audio: np.ndarray, mono or stereo audio
+    - sr: sample rate
+    - bpm: tempo for beat tracking
+    - silence_thresh_db: beats peaking below this level are marked silent
+    - cache: optional FileAnalysisCache for the source file, reuses a previous analysis
+    - profiler: optional Profiler, records onset detection, beat tracking and silence removal spans
+    - beat_mode: "track" runs librosa's beat tracker, "grid" lays a fixed grid at bpm
+      over the stem (see beat_grid), for stems already normalised to bpm
+    - check_drift: in grid mode, warn when the onsets drift away from the grid
+    - analysis_sr: run onset detection and beat tracking on a mono copy decimated to
+      about this rate (see analysis_mix); positions still refer to the full-rate audio
+    - features: also compute per-frame spectral features for similarity-based selection
+    - onsets: False when the onset envelope will not be used for transient slicing;
+      grid mode then only needs a decimated envelope (see analyze_song)
+
+    Returns:
+    - StemAnalysis
+    """
+    return analyze_song(
+        [audio], sr, bpm, silence_thresh_db=silence_thresh_db, hop_length=hop_length, caches=[cache],
+        profiler=profiler, beat_mode=beat_mode, check_drift=check_drift, analysis_sr=analysis_sr, features=features,
+        per_stem_onsets=onsets
+    )[0]
+
+
+def analyze_song(audios, sr, bpm, silence_thresh_db=-40, hop_length=512, caches=None, profiler=None,
+                 beat_mode="track", check_drift=True, analysis_sr=None, features=False, song_id=None,
+                 per_stem_onsets=True):
+    """
+    Analyzes all stems of one song together. The stems share a timeline, so the beat
+    grid is found once, from the onset envelope of the summed mix, and every stem
+    gets the same grid, keeping cut points aligned across stems. Energy prefix sums
+    are computed in one batched pass over the stacked mono mixes; silence masks are
+    measured per stem against the shared grid.
+
+    Parameters are those of analyze_stem, except:
+    - audios: list of mono or stereo arrays, one per stem, all at sr
+    - caches: optional list of FileAnalysisCache, one per stem
+    - song_id: identifies the song's set of stems in cache keys, so a cached grid is
+      not reused once any stem of the song changes
+    - per_stem_onsets: also compute each stem's own onset envelope, needed for
+      transient slicing. Without it the stems share the summed mix's envelope and
+      onset detection runs once per song instead of once per stem. In grid mode
+      that envelope is then only used for the grid phase and drift check, so unless
+      analysis_sr is given it is computed at GRID_ANALYSIS_SR.
+
+    Returns:
+    - list of StemAnalysis, in the order of audios
+    """
+    import librosa
+    profiler = profiler or NullProfiler()
+    caches = caches or [None] * len(audios)
+
+    if beat_mode not in BEAT_MODES:
+        raise ValueError("beat_mode must be 'track' or 'grid'")
+
+    analysis_sr = effective_analysis_sr(beat_mode, analysis_sr, per_stem_onsets)
+    song_id = _song_key(song_id, per_stem_onsets)
+    params = _cache_params(sr, bpm, silence_thresh_db, hop_length, beat_mode, analysis_sr, song_id)
+    cached = [
+        load_cached_analysis(cache, sr, bpm, silence_thresh_db, hop_length, beat_mode, analysis_sr, song_id=song_id)
+        for cache in caches
+    ]
+    # features are cached on their own, so switching selection modes reuses the analysis
+    feature_prefixes = [_load_cached_features(cache, sr, hop_length, analysis_sr) for cache in caches] if features else []
+    if all(analysis is not None for analysis in cached + feature_prefixes):
+        return _with_features(cached, feature_prefixes)
+
+    # stacked mono mixes, shorter stems zero-padded to the longest
+    lengths = [audio.shape[-1] for audio in audios]
+    monos = np.zeros((len(audios), max(lengths)), dtype=np.float32)
+    for i, audio in enumerate(audios):
+        monos[i, :lengths[i]] = np.mean(audio, axis=0) if audio.ndim == 2 else audio
+
+    with profiler.span("decimate", analysis_sr=analysis_sr):
+        mixes, mix_sr, mix_hop = analysis_mix(monos, sr, hop_length, analysis_sr)
+
+    n_fft = _mix_n_fft(sr, mix_sr, mix_hop)
+    if features:
+        with profiler.span("features", stems=sum(prefix is None for prefix in feature_prefixes)):
+            for i, cache in enumerate(caches):
+                if feature_prefixes[i] is None:
+                    frame_features = _frame_features(mixes[i], mix_sr, mix_hop, n_fft)
+                    _store_features(cache, frame_features, sr, hop_length, analysis_sr)
+                    feature_prefixes[i] = _feature_prefix(frame_features)
+    if all(analysis is not None for analysis in cached):
+        return _with_features(cached, feature_prefixes)
+
+    per_stem_onsets = per_stem_onsets and len(audios) > 1  # a single stem is its own mix
+    with profiler.span("onset_detection", stems=len(audios) if per_stem_onsets else 0):
+        # one row at a time: batched onset_strength would share one dB floor across stems
+        mix_envelope, beat_envelope = onset_envelopes(mixes.sum(axis=0), mix_sr, mix_hop, n_fft)
+        if per_stem_onsets:
+            stem_envelopes = [
+                librosa.onset.onset_strength(y=mix, sr=mix_sr, hop_length=mix_hop, n_fft=n_fft) for mix in mixes
+            ]
+        else:
+            stem_envelopes = [mix_envelope] * len(audios)
+    with profiler.span("beat_tracking", mode=beat_mode):
+        beat_samples = _beat_samples(beat_envelope, mix_sr, mix_hop, bpm, hop_length, beat_mode, check_drift)
+    with profiler.span("silence_removal", stems=len(audios)):
+        # per stem on purpose: stacking the stems' peaks first costs an extra pass over
+        # all samples, which is slower than the reduceat calls it saves
+        keeps = [beat_silence_mask(audio, beat_samples, sr, silence_thresh_db) for audio in audios]
+    with profiler.span("energy", stems=len(audios)):
+        energy_prefixes = _energy_prefix(monos, hop_length)
+
+    analyses = []
+    for i, cache in enumerate(caches):
+        analysis = StemAnalysis(
+            sr=sr,
+            n_samples=lengths[i],
+            beat_samples=beat_samples,
+            keep=keeps[i],
+            onset_envelope=stem_envelopes[i],
+            energy_prefix=energy_prefixes[i],
+            hop_length=hop_length
+        )
+        _store_analysis(cache, analysis, params)
+        analyses.append(analysis)
+    return _with_features(analyses, feature_prefixes)
+
+
+def analyze_stem_file(stem, bpm, silence_thresh_db=-40, hop_length=512, cache=None, profiler=None, beat_mode="track",
+                      analysis_sr=None, features=False, onsets=True):
+    """
+    Analysis of a Stem without keeping its audio around.
+    On a cache hit only the file header is read; otherwise the stem is decoded,
+    analyzed and its audio released again.
+
+    Returns:
+    - StemAnalysis
+    """
+    return _analyze_files(
+        [stem], bpm, silence_thresh_db, hop_length, [cache], None, profiler, beat_mode, analysis_sr, features, onsets
+    )[0]
+
+
+def analyze_song_files(stems, bpm, silence_thresh_db=-40, hop_length=512, analysis_cache=None, profiler=None,
+                       beat_mode="track", analysis_sr=None, features=False, per_stem_onsets=True):
+    """
+    analyze_song for the Stems of one song, without keeping their audio around.
+    When every stem is cached only the file headers are read; otherwise all stems
+    are decoded, analyzed together and released again.
+
+    Returns:
+    - list of StemAnalysis, in the order of stems
+    """
+    caches = [None] * len(stems)
+    song_id = None
+    if analysis_cache is not None:
+        caches = [analysis_cache.for_file(stem.filepath) for stem in stems]
+        song_id = sorted(analysis_cache.file_id(stem.filepath) for stem in stems)
+
+    return _analyze_files(
+        stems, bpm, silence_thresh_db, hop_length, caches, song_id, profiler, beat_mode, analysis_sr, features,
+        per_stem_onsets
+    )
+
+
+def _analyze_files(stems, bpm, silence_thresh_db, hop_length, caches, song_id, profiler=None, beat_mode="track",
+                   analysis_sr=None, features=False, per_stem_onsets=True):
+    """
+    analyze_song over Stems: cache lookup from the headers, then decode, analyze and release.
+    """
+    profiler = profiler or NullProfiler()
+
+    rates = {stem.load_info().samplerate for stem in stems}
+    if len(rates) > 1:
+        raise ValueError(f"Stems of song '{stems[0].song_name}' have different sample rates "
+                         f"(set stem_store_dir to resample mixed-rate libraries)")
+    sr = rates.pop()
+
+    cached = [
+        load_cached_analysis(
+            cache, sr, bpm, silence_thresh_db, hop_length, beat_mode,
+            effective_analysis_sr(beat_mode, analysis_sr, per_stem_onsets), features, _song_key(song_id, per_stem_onsets)
+        )
+        for cache in caches
+    ]
+    if all(analysis is not None for analysis in cached):
+        return cached
+
+    audios = []
+    for stem in stems:
+        with profiler.span("decode", stem=stem.filepath):
+            audios.append(stem.load_audio()[0])
+    analyses = analyze_song(
+        audios, sr, bpm, silence_thresh_db=silence_thresh_db, hop_length=hop_length, caches=caches,
+        profiler=profiler, beat_mode=beat_mode, analysis_sr=analysis_sr, features=features, song_id=song_id,
+        per_stem_onsets=per_stem_onsets
+    )
+    for stem in stems:
+        stem.release_audio()
+    return analyses
+
+
+def analyze_features_file(stem, hop_length=512, cache=None, profiler=None, analysis_sr=None):
+    """
+    Spectral feature prefix sums (see _feature_prefix) of a Stem on their own, for an
+    analysis that was computed without them. analysis_sr is the rate that analysis
+    ran at (see effective_analysis_sr), so the features match the ones analyze_song
+    would have added. The stem is only decoded when its features are not cached.
+
+    Returns:
+    - np.ndarray, see StemAnalysis.feature_prefix
+    """
+    profiler = profiler or NullProfiler()
+    sr = stem.load_info().samplerate
+    feature_prefix = _load_cached_features(cache, sr, hop_length, analysis_sr)
+    if feature_prefix is not None:
+        return feature_prefix
+
+    with profiler.span("decode", stem=stem.filepath):
+        audio, _ = stem.load_audio()
+    with profiler.span("features", stems=1):
+        mono = np.mean(audio, axis=0) if audio.ndim == 2 else audio
+        mix, mix_sr, mix_hop = analysis_mix(np.asarray(mono, dtype=np.float32), sr, hop_length, analysis_sr)
+        frame_features = _frame_features(mix, mix_sr, mix_hop, _mix_n_fft(sr, mix_sr, mix_hop))
+    stem.release_audio()
+    _store_features(cache, frame_features, sr, hop_length, analysis_sr)
+    return _feature_prefix(frame_features)
+
+
+def load_cached_analysis(cache, sr, bpm, silence_thresh_db=-40, hop_length=512, beat_mode="track", analysis_sr=None,
+                         features=False, song_id=None):
+    """
+    Returns the StemAnalysis stored in a FileAnalysisCache, or None on a miss. With
+    features, the separately cached feature prefix is attached and missing it is a miss.
+    """
+    if cache is None:
+        return None
+
+    cached = cache.get("analysis", **_cache_params(sr, bpm, silence_thresh_db, hop_length, beat_mode, analysis_sr, song_id))
+    feature_prefix = _load_cached_features(cache, sr, hop_length, analysis_sr) if features else None
+    if cached is None or (features and feature_prefix is None):
+        return None
+
+    return StemAnalysis(
+        sr=sr,
+        n_samples=int(cached["n_samples"]),
+        beat_samples=cached["beat_samples"],
+        keep=cached["keep"],
+        onset_envelope=cached["onset_envelope"],
+        energy_prefix=cached["energy_prefix"],
+        hop_length=hop_length,
+        feature_prefix=feature_prefix
+    )
+
+
+def effective_analysis_sr(beat_mode, analysis_sr=None, onsets=True):
+    """
+    The rate the analysis mix is decimated to: analysis_sr, or GRID_ANALYSIS_SR in grid
+    mode when no onsets are needed.
+    """
+    if beat_mode == "grid" and not onsets and analysis_sr is None:
+        return GRID_ANALYSIS_SR
+    return analysis_sr
+
+
+def _cache_params(sr, bpm, silence_thresh_db, hop_length, beat_mode="track", analysis_sr=None, song_id=None):
+    params = {
+        "version": ANALYSIS_VERSION,
+        "sr": sr,
+        "bpm": bpm,
+        "silence_thresh_db": silence_thresh_db,
+        "hop_length": hop_length,
+        "beat_mode": beat_mode,
+        "analysis_sr": analysis_sr
+    }
+    if song_id is not None:  # only keyed when the grid is shared, so per-stem entries stay valid
+        params["song_id"] = song_id
+    return params
+
+
+def _song_key(song_id, per_stem_onsets):
+    return None if song_id is None else {"stems": song_id, "per_stem_onsets": per_stem_onsets}
+
+
+def _store_analysis(cache, analysis, params):
+    if cache is None:
+        return
+    arrays = {
+        "n_samples": np.array(analysis.n_samples, dtype=np.int64),
+        "beat_samples": analysis.beat_samples,
+        "keep": analysis.keep,
+        "onset_envelope": analysis.onset_envelope.astype(np.float32),
+        "energy_prefix": analysis.energy_prefix
+    }
+    cache.put("analysis", arrays, **params)
+
+
+def _feature_cache_params(sr, hop_length, analysis_sr):
+    # features only depend on the analysis mix, not on tempo, beat grid or silence threshold
+    return {"version": ANALYSIS_VERSION, "sr": sr, "hop_length": hop_length, "analysis_sr": analysis_sr}
+
+
+def _load_cached_features(cache, sr, hop_length, analysis_sr):
+    if cache is None:
+        return None
+    cached = cache.get("features", **_feature_cache_params(sr, hop_length, analysis_sr))
+    return None if cached is None else _feature_prefix(cached["frame_features"])
+
+
+def _store_features(cache, frame_features, sr, hop_length, analysis_sr):
+    # the float32 frames rather than the float64 prefix sums: half the size, and the sums
+    # rebuilt on load equal fresh ones, which are summed from the same float32 frames
+    if cache is not None:
+        cache.put("features", {"frame_features": frame_features}, **_feature_cache_params(sr, hop_length, analysis_sr))
+
+
+def _with_features(analyses, feature_prefixes):
+    for analysis, feature_prefix in zip(analyses, feature_prefixes):
+        analysis.feature_prefix = feature_prefix
+    return analyses
+
+
+def _mix_n_fft(sr, mix_sr, mix_hop):
+    # frames of the decimated mix line up with hop_length frames of the full-rate audio;
+    # its FFT window shrinks with the hop (2048 at 512), but 128 mel bands need at least 512 bins
+    return 2048 if mix_sr == sr else max(4 * mix_hop, 512)
+
+
+def onset_envelopes(mix, sr, hop_length=512, n_fft=2048):
+    """
+    The mean-aggregated onset envelope used for onset picking and the median-aggregated
+    one librosa's beat tracker uses on its own, both from one log-power mel spectrogram.
+
+    Returns: (onset_envelope, beat_envelope)
+    """
+    import librosa
+    mel = librosa.power_to_db(librosa.feature.melspectrogram(y=mix, sr=sr, n_fft=n_fft, hop_length=hop_length))
+    params = dict(S=mel, sr=sr, hop_length=hop_length, n_fft=n_fft)  # n_fft sets the centering offset
+    return librosa.onset.onset_strength(**params), librosa.onset.onset_strength(aggregate=np.median, **params)
+
+
+def _beat_samples(onset_envelope, mix_sr, mix_hop, bpm, hop_length, beat_mode="track", check_drift=True):
+    """
+    Beat boundaries, in full-rate samples, from a (median-aggregated, see onset_envelopes)
+    onset envelope at mix_sr / mix_hop.
+    """
+    import librosa
+    if beat_mode == "grid":
+        beat_frames = beat_grid(onset_envelope, mix_sr, bpm, mix_hop, check_drift=check_drift)
+    else:
+        tempo, beat_frames = librosa.beat.beat_track(
+            onset_envelope=onset_envelope, sr=mix_sr, hop_length=mix_hop, bpm=bpm, units='frames'
+        )
+    return librosa.frames_to_samples(beat_frames, hop_length=hop_length).astype(np.int64)
+
+
+def analysis_mix(mono, sr, hop_length=512, analysis_sr=None):
+    """
+    Mono mix to run onset detection and beat tracking on. Beat-level results do not
+    need the full rate, so when analysis_sr is below sr the mix is decimated. The
+    decimated hop is hop_length scaled to the new rate and rounded, and the rate is
+    nudged so that every decimated frame covers exactly hop_length source samples;
+    frame indices then map back to full-rate positions with the usual hop_length.
+
+    Returns: (mix, mix_sr, mix_hop_length)
+    """
+    import librosa
+    if analysis_sr is None or analysis_sr >= sr:
+        return mono, sr, hop_length
+
+    mix_hop = max(1, int(round(hop_length * analysis_sr / sr)))
+    mix_sr = sr * mix_hop / hop_length
+    mix = librosa.resample(mono, orig_sr=sr, target_sr=mix_sr, res_type="soxr_lq")
+    return mix, mix_sr, mix_hop
+
+
+def beat_grid(onset_envelope, sr, bpm, hop_length=512, check_drift=True):
+    """
+    Beat frames of a fixed grid at bpm, for stems whose tempo is already known exactly.
+    Only the phase is estimated from the onset envelope; every beat after that is
+    placed arithmetically, so no beat-tracking dynamic program is run.
+
+    Returns:
+    - np.ndarray of beat frames (int64)
+    """
+    period = 60.0 * sr / (bpm * hop_length)  # frames per beat
+    phase = estimate_grid_phase(onset_envelope, period)
+    beat_frames = np.round(np.arange(phase, len(onset_envelope) - 1, period)).astype(np.int64)
+
+    if check_drift:
+        drift = grid_drift(onset_envelope, period, phase)
+        if drift > GRID_DRIFT_TOLERANCE * period:
+            print(f"[WARNING] Onsets drift up to {drift * hop_length / sr * 1000:.0f} ms from the {bpm} BPM grid, "
+                  f"is the stem really at {bpm} BPM? Use beat_mode='track' otherwise.")
+
+    return beat_frames
+
+
+def estimate_grid_phase(onset_envelope, period):
+    """
+    Offset (in frames, within one beat period) at which a grid with this period
+    collects the most onset strength.
+    """
+    return int(np.argmax(grid_phase_scores(onset_envelope, period)))
+
+
+def grid_phase_scores(onset_envelope, period):
+    """
+    Onset strength collected by a grid with this period for every whole-frame phase
+    offset within one period, all offsets scored at once.
+    """
+    n_frames = len(onset_envelope)
+    phases = np.arange(int(np.ceil(period)))
+    beats = np.arange(int(n_frames // period) + 1) * period
+    frames = np.round(phases[:, np.newaxis] + beats[np.newaxis, :]).astype(np.int64)
+    inside = frames < n_frames
+    return np.where(inside, onset_envelope[np.minimum(frames, n_frames - 1)], 0.0).sum(axis=1)
+
+
+def grid_drift(onset_envelope, period, phase, window_beats=8):
+    """
+    Largest per-window median distance (in frames) between the onsets and the grid.
+    Sparse onsets (the strongest within a quarter beat) are peak-picked and each one
+    is measured against the nearest line of a half-beat grid, so on-beats and
+    off-beats both count as on the grid. Taking the median over short windows of
+    window_beats beats lets the error of a wrong tempo grow with time instead of
+    averaging out. Near zero when the stem really is at the grid tempo.
+    """
+    onsets = grid_onsets(onset_envelope, period)
+    if len(onsets) == 0:
+        return 0.0
+
+    half_period = period / 2
+    offsets = (onsets - phase) % half_period
+    distances = np.minimum(offsets, half_period - offsets)
+    windows = (onsets // (window_beats * period)).astype(np.int64)
+
+    drift = 0.0
+    for window in np.unique(windows):
+        window_distances = distances[windows == window]
+        if len(window_distances) >= 3:  # too few onsets say nothing about the tempo
+            drift = max(drift, float(np.median(window_distances)))
+    return drift
+
+
+def grid_onsets(onset_envelope, period):
+    """
+    Frames of the strongest onsets, at most one per quarter beat (period in frames).
+    """
+    import librosa
+    span = max(int(period / 4), 1)
+    peak = onset_envelope.max()
+    if peak <= onset_envelope.min():
+        return np.zeros(0, dtype=np.int64)
+    normalized = (onset_envelope - onset_envelope.min()) / (peak - onset_envelope.min())
+    return librosa.util.peak_pick(
+        normalized, pre_max=span, post_max=span + 1, pre_avg=int(period), post_avg=int(period) + 1, delta=0.07, wait=span
+    )
+
+
+def _energy_prefix(mono, hop_length):
+    """
+    Prefix sums of squared samples at each hop_length frame boundary (the last frame
+    zero-padded), so energy_prefix[j] - energy_prefix[i] covers frames i to j.
+    Several equal-length mixes stacked as rows are summed in one pass, one row each.
+    """
+    n = mono.shape[-1]
+    n_full = n // hop_length
+    # a view of the whole frames, squared and summed in float64 without copying the signal
+    frames = mono[..., :n_full * hop_length].reshape(mono.shape[:-1] + (n_full, hop_length))
+    frame_energy = np.einsum("...ij,...ij->...i", frames, frames, dtype=np.float64)
+    if n_full * hop_length < n:
+        tail = mono[..., n_full * hop_length:].astype(np.float64)  # only the partial last frame
+        frame_energy = np.concatenate([frame_energy, np.sum(tail**2, axis=-1, keepdims=True)], axis=-1)
+    zeros = np.zeros(mono.shape[:-1] + (1,))
+    return np.concatenate([zeros, np.cumsum(frame_energy, axis=-1)], axis=-1)
+
+
+def _frame_features(mix, sr, hop_length, n_fft=2048):
+    """
+    N_MFCC MFCCs, 12 chroma bins and the spectral centroid of every frame, all from
+    one STFT of the analysis mix. Frames line up with the onset envelope.
+
+    Returns: float32 array of shape (frames, N_FEATURES)
+    """
+    import librosa
+    magnitude = np.abs(librosa.stft(mix, n_fft=n_fft, hop_length=hop_length))
+    power = magnitude**2
+    mfcc = librosa.feature.mfcc(S=librosa.power_to_db(librosa.feature.melspectrogram(S=power, sr=sr)), n_mfcc=N_MFCC)
+    chroma = librosa.feature.chroma_stft(S=power, sr=sr, tuning=0.0)  # skip tuning estimation, the slowest part
+    centroid = librosa.feature.spectral_centroid(S=magnitude, sr=sr)
+
+    return np.vstack([mfcc, chroma, centroid]).T.astype(np.float32)
+
+
+def _feature_prefix(frame_features):
+    """
+    Prefix sums over frames of _frame_features, so feature_prefix[j] - feature_prefix[i]
+    sums frames i to j.
+    """
+    return np.concatenate([np.zeros((1, N_FEATURES)), np.cumsum(frame_features, axis=0, dtype=np.float64)])
+
+
+def beat_silence_mask(audio, beat_boundaries, sr, silence_thresh_db=-40):
+    """
+    Returns one bool per beat span, True where the span peaks above silence_thresh_db.
+    Vectorized: per-beat maxima and minima are taken with reduceat in one pass over
+    the signal, then all beats are thresholded at once.
+    """
+    n_spans = max(len(beat_boundaries) - 1, 0)
+    channels = audio if audio.ndim == 2 else audio[np.newaxis, :]
+
+    bounds = np.clip(np.asarray(beat_boundaries, dtype=np.int64), 0, channels.shape[1])
+    starts, ends = bounds[:-1], bounds[1:]
+    non_empty = ends > starts
+
+    peak_db = np.full(n_spans, -np.inf)
+    if np.any(non_empty):
+        # spans are contiguous, so each non-empty start runs up to the next one
+        # and cutting the signal at the last end closes the final span
+        indices = starts[non_empty]
+        signal = channels[:, :ends[non_empty][-1]]
+        span_max = np.maximum.reduceat(signal, indices, axis=1)
+        span_min = np.minimum.reduceat(signal, indices, axis=1)
+        peaks = np.maximum(span_max, -span_min).max(axis=0)  # peak |x| across channels
+        peak_db[non_empty] = 20 * np.log10(peaks + 1e-6)  # avoid log(0)
+
+    return peak_db > silence_thresh_db
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import zipfile
+import numpy as np
+from frankenstem.file_utils import atomic_write, file_signature
+
+# cache directory -> estimated size in bytes, per process: scanned on the first write, then
+# grown by each write, so the directory is only listed again when it may be over budget
+_estimated_sizes = {}
+EVICT_TO = 0.9  # evict down to this share of max_bytes, so a full cache isn't rescanned on every write
+
+
+class AnalysisCache:
+    """
+    Content-addressed on-disk cache for per-stem analysis results
+    (beat frames, onset frames, silence spans).
+
+    Entries are keyed by the source file (mtime/size, or a hash of its contents),
+    the analysis kind and its parameters (sample rate, BPM, thresholds...), and are
+    stored as uncompressed .npz files. Writes go through a temporary file and an
+    atomic rename, so several worker processes can share one cache directory.
+    The least recently used entries are evicted once the directory grows past max_bytes.
+
+    Kinds listed in kind_budgets (kind -> bytes) live in a subdirectory of their own
+    with their own budget, so large entries (spectral features) cannot evict the
+    small beat and silence analyses, or the other way round.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, hash_contents=False, kind_budgets=None):
+        self.cache_dir = str(cache_dir)
+        self.max_bytes = max_bytes
+        self.hash_contents = hash_contents
+        self._file_ids = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._kind_caches = {
+            kind: AnalysisCache(os.path.join(self.cache_dir, kind), budget) for kind, budget in (kind_budgets or {}).items()
+        }
+
+    def for_file(self, filepath):
+        return FileAnalysisCache(self, filepath)
+
+    def for_kind(self, kind):
+        """
+        The cache entries of kind are stored in: a separately budgeted one, or this one.
+        """
+        return self._kind_caches.get(kind, self)
+
+    def file_id(self, filepath):
+        """
+        Identifies the current contents of a file: its path, mtime and size,
+        or a SHA-1 of its bytes when hash_contents is set.
+        """
+        signature = file_signature(filepath)
+        if not self.hash_contents:
+            return signature
+
+        if signature not in self._file_ids:
+            digest = hashlib.sha1()
+            with open(filepath, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            self._file_ids[signature] = digest.hexdigest()
+        return self._file_ids[signature]
+
+    def make_key(self, filepath, kind, **params):
+        payload = json.dumps([self.file_id(filepath), kind, params], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Returns the cached arrays for key as a dict, or None on a miss.
+        Unreadable entries (e.g. evicted mid-read by another process) count as misses.
+        """
+        path = self._entry_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = {name: data[name] for name in data.files}
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+            return None
+        return arrays
+
+    def put(self, key, **arrays):
+        path = self._entry_path(key)
+        with atomic_write(path) as f:
+            np.savez(f, **arrays)
+
+        if self.cache_dir in _estimated_sizes:
+            _estimated_sizes[self.cache_dir] += os.path.getsize(path)
+        else:
+            _estimated_sizes[self.cache_dir] = self._scan()[1]
+        if _estimated_sizes[self.cache_dir] > self.max_bytes:
+            self._evict_entries()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in max_bytes (with
+        some room to spare, see EVICT_TO), here
+        and in the separately budgeted kinds. Writes only evict once their process's
+        size estimate goes over budget, which misses what other processes wrote, so
+        callers fanning writes out over a pool should evict once they are done.
+        """
+        for cache in self._kind_caches.values():
+            cache.evict()
+        self._evict_entries()
+
+    def _evict_entries(self):
+        entries, total = self._scan()
+        _estimated_sizes[self.cache_dir] = total
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # already evicted by another process
+            total -= size
+            if total <= self.max_bytes * EVICT_TO:
+                break
+        _estimated_sizes[self.cache_dir] = total
+
+    def _scan(self):
+        """
+        Returns: ([(mtime, size, path) of every entry], total size)
+        """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".npz"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        return entries, total
+
+
+class FileAnalysisCache:
+    """
+    View of an AnalysisCache bound to one source file.
+    """
+
+    def __init__(self, cache, filepath):
+        self.cache = cache
+        self.filepath = filepath
+
+    def get(self, kind, **params):
+        return self.cache.for_kind(kind).get(self.cache.make_key(self.filepath, kind, **params))
+
+    def put(self, kind, arrays, **params):
+        self.cache.for_kind(kind).put(self.cache.make_key(self.filepath, kind, **params), **arrays)
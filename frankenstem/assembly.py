@@ -0,0 +1,75 @@
+import random
+import numpy as np
+
+
+def choose_segments(source_lengths, target_samples, rng=None):
+    """
+    Picks segments at random until target_samples is filled: a source uniformly, then
+    a segment of that source uniformly, like drawing one at a time, but in batches of
+    draws whose running total is cut with a cumulative sum and searchsorted.
+
+    Parameters:
+        source_lengths: one array of segment lengths (in samples) per source
+        target_samples: output length in samples
+        rng: random.Random, the random module when None
+
+    Returns: (source indices, segment indices, lengths taken), the last length trimmed
+    so the lengths add up to exactly target_samples
+    """
+    rng = rng or random
+    source_lengths = [np.asarray(lengths, dtype=np.int64) for lengths in source_lengths]
+    sizes = np.array([len(lengths) for lengths in source_lengths], dtype=np.int64)
+    sources = np.flatnonzero(sizes)  # empty sources can never be drawn from
+    if target_samples <= 0 or len(sources) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    flat_lengths = np.concatenate(source_lengths)
+    if flat_lengths.max() <= 0:
+        raise ValueError("Every segment is empty, target_samples cannot be reached.")
+    mean_length = np.mean([source_lengths[s].mean() for s in sources])
+    generator = np.random.default_rng(rng.getrandbits(64))
+
+    source_parts, segment_parts, length_parts = [], [], []
+    total = 0
+    while total < target_samples:
+        n_draws = int((target_samples - total) / max(mean_length, 1) * 1.25) + 8
+        source_idx = sources[generator.integers(len(sources), size=n_draws)]
+        segment_idx = (generator.random(n_draws) * sizes[source_idx]).astype(np.int64)
+        lengths = flat_lengths[offsets[source_idx] + segment_idx]
+
+        cumulative = total + np.cumsum(lengths)
+        n_taken = min(int(np.searchsorted(cumulative, target_samples, side="left")) + 1, n_draws)
+        source_parts.append(source_idx[:n_taken])
+        segment_parts.append(segment_idx[:n_taken])
+        length_parts.append(lengths[:n_taken])
+        total = int(cumulative[n_taken - 1])
+
+    source_idx = np.concatenate(source_parts)
+    segment_idx = np.concatenate(segment_parts)
+    lengths = np.concatenate(length_parts)
+    lengths[-1] -= total - target_samples
+    return source_idx, segment_idx, lengths
+
+
+def assemble(sources, target_samples, rng=None):
+    """
+    Builds target_samples of audio from segments drawn at random from sources (lists
+    of mono (n,) or channel-first (channels, n) arrays), copying each one straight into
+    a single preallocated float32 output. Mono segments are repeated across channels
+    when any source is multichannel.
+
+    Returns: (n,) array, or (channels, n) if any segment has channels
+    """
+    lengths = [[segment.shape[-1] for segment in source] for source in sources]
+    source_idx, segment_idx, taken = choose_segments(lengths, target_samples, rng)
+
+    channels = max((segment.shape[0] for source in sources for segment in source if segment.ndim == 2), default=None)
+    output = np.empty((channels or 1, int(taken.sum())), dtype=np.float32)
+    position = 0
+    for s, i, n in zip(source_idx.tolist(), segment_idx.tolist(), taken.tolist()):
+        output[:, position:position + n] = sources[s][i][..., :n]
+        position += n
+
+    return output if channels else output[0]
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+import threading
+import numpy as np
+
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+class DecodedAudioCache:
+    """
+    Decoded stem audio shared by all Stems of a library, bounded by max_bytes.
+    The least recently used arrays are dropped once the budget is exceeded, so the
+    resident audio no longer grows with the size of the library. Arrays are kept as
+    float32, or as float16 to fit twice as much audio at reduced precision.
+    Safe to use from several threads (e.g. the fragment export threads).
+    """
+
+    def __init__(self, max_bytes=1024 * 1024 * 1024, dtype="float32"):
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError("dtype must be 'float32' or 'float16'")
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self._entries = OrderedDict()  # key -> (audio, sr)
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # sent to worker processes empty, each process keeps its own entries
+        return {"max_bytes": self.max_bytes, "dtype": self.dtype}
+
+    def __setstate__(self, state):
+        self.__init__(state["max_bytes"], state["dtype"])
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def get(self, key):
+        """
+        Returns (audio, sr) as stored, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, audio, sr):
+        """
+        Stores audio in the storage dtype, evicting least recently used entries to stay
+        within max_bytes. Arrays larger than the whole budget are not kept.
+
+        Returns: (stored audio, sr)
+        """
+        audio = np.ascontiguousarray(audio, dtype=STORAGE_DTYPES[self.dtype])
+        with self._lock:
+            self._discard(key)
+            if audio.nbytes <= self.max_bytes:
+                self._entries[key] = (audio, sr)
+                self._nbytes += audio.nbytes
+                while self._nbytes > self.max_bytes:
+                    _, (evicted, _) = self._entries.popitem(last=False)
+                    self._nbytes -= evicted.nbytes
+        return audio, sr
+
+    def discard(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._nbytes -= entry[0].nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
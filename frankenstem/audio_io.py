@@ -1,4 +1,7 @@
-import librosa
+from collections import namedtuple
+import soundfile as sf
+
+AudioInfo = namedtuple("AudioInfo", ["samplerate", "frames", "channels"])
 
 def load_audio(file_path):
     """
@@ -6,5 +9,52 @@ def load_audio(file_path):
 
     Returns: (audio_array, sample_rate)
     """
+    import librosa
     audio, sr = librosa.load(file_path, sr=None, mono=False)
     return audio, sr
+
+
+def audio_info(file_path):
+    """
+    Read sample rate, length and channel count from the file header without decoding.
+
+    Returns: AudioInfo(samplerate, frames, channels)
+    """
+    info = sf.info(file_path)
+    return AudioInfo(info.samplerate, info.frames, info.channels)
+
+
+def read_audio_ranges(file_path, ranges):
+    """
+    Read (start, end) sample ranges from an audio file by seeking, without decoding the rest.
+    Arrays match load_audio: float32, channel-first for multichannel files, 1-D for mono.
+
+    Returns: list of arrays in the order of ranges
+    """
+    segments = [None] * len(ranges)
+    order = sorted(range(len(ranges)), key=lambda i: ranges[i][0])  # read forwards through the file
+
+    with sf.SoundFile(file_path) as f:
+        for i in order:
+            start, end = ranges[i]
+            f.seek(start)
+            data = f.read(end - start, dtype='float32', always_2d=True)
+            segments[i] = data[:, 0] if f.channels == 1 else data.T
+
+    return segments
+
+
+def iter_audio_blocks(file_path, start, end, block_size):
+    """
+    Read the [start, end) sample range of an audio file in blocks of at most block_size frames.
+    Blocks match load_audio: float32, channel-first for multichannel files, 1-D for mono.
+    """
+    with sf.SoundFile(file_path) as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = f.read(min(block_size, remaining), dtype='float32', always_2d=True)
+            if len(data) == 0:
+                break
+            remaining -= len(data)
+            yield data[:, 0] if f.channels == 1 else data.T
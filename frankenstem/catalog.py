@@ -0,0 +1,167 @@
+from collections import namedtuple
+import os
+from pathlib import Path
+import sqlite3
+import soundfile as sf
+from frankenstem.audio_io import AudioInfo
+from frankenstem.classes import Stem, StemType
+from frankenstem.filename_parser import parse_filename, group_into_songs
+
+CatalogEntry = namedtuple(
+    "CatalogEntry", ["path", "song", "stem_type", "samplerate", "frames", "channels", "duration"]
+)
+
+ScanResult = namedtuple("ScanResult", ["added", "updated", "removed", "unchanged", "skipped"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stems (
+    path TEXT PRIMARY KEY,
+    song TEXT NOT NULL,
+    stem_type TEXT NOT NULL,
+    samplerate INTEGER NOT NULL,
+    frames INTEGER NOT NULL,
+    channels INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stems_song ON stems (song);
+CREATE INDEX IF NOT EXISTS stems_type ON stems (stem_type);
+CREATE INDEX IF NOT EXISTS stems_samplerate ON stems (samplerate);
+CREATE INDEX IF NOT EXISTS stems_duration ON stems (duration);
+"""
+
+
+class LibraryCatalog:
+    """
+    SQLite catalog of the stems under one or more folders, with the song name, stem type
+    and header metadata (sample rate, length, channels) of every file. Folders are scanned
+    recursively reading headers only, and rescans only re-read files whose mtime or size
+    changed, so large libraries load, and can be queried and subselected, without
+    touching any audio data.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def scan(self, root):
+        """
+        Brings the catalog up to date with the .wav stems under root: new and changed
+        files are (re)read, files that disappeared are dropped.
+
+        Returns: ScanResult(added, updated, removed, unchanged, skipped)
+        """
+        root = os.path.abspath(root)
+        known = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in self.connection.execute(
+                "SELECT path, mtime_ns, size FROM stems WHERE " + _under_root_clause(), _under_root_params(root)
+            )
+        }
+
+        rows = []
+        seen = set()
+        added = updated = unchanged = skipped = 0
+        for filepath in sorted(Path(root).rglob("*.wav")):
+            path = str(filepath)
+            stat = filepath.stat()
+            seen.add(path)
+            if known.get(path) == (stat.st_mtime_ns, stat.st_size):
+                unchanged += 1
+                continue
+
+            try:
+                song_name, stem_type = parse_filename(filepath.name)
+                info = sf.info(path)
+            except (ValueError, RuntimeError) as e:  # soundfile raises RuntimeError for unreadable files
+                print(f"Skipping '{filepath.name}': {e}")
+                skipped += 1
+                continue
+
+            rows.append((
+                path, song_name, stem_type.value, info.samplerate, info.frames, info.channels,
+                info.frames / info.samplerate, stat.st_mtime_ns, stat.st_size
+            ))
+            if path in known:
+                updated += 1
+            else:
+                added += 1
+
+        removed = [(path,) for path in known if path not in seen]
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO stems VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.connection.executemany("DELETE FROM stems WHERE path = ?", removed)
+
+        return ScanResult(added, updated, len(removed), unchanged, skipped)
+
+    def query(self, root=None, songs=None, stem_types=None, samplerate=None, min_duration=None, max_duration=None):
+        """
+        Catalogued stems matching every given filter, ordered by path.
+        Durations are in seconds.
+
+        Returns: list of CatalogEntry
+        """
+        clauses = []
+        params = []
+        if root is not None:
+            clauses.append(_under_root_clause())
+            params.extend(_under_root_params(os.path.abspath(root)))
+        if songs is not None:
+            clauses.append(f"song IN ({', '.join('?' * len(songs))})")
+            params.extend(songs)
+        if stem_types is not None:
+            clauses.append(f"stem_type IN ({', '.join('?' * len(stem_types))})")
+            params.extend(stem_type.value for stem_type in stem_types)
+        if samplerate is not None:
+            clauses.append("samplerate = ?")
+            params.append(samplerate)
+        if min_duration is not None:
+            clauses.append("duration >= ?")
+            params.append(min_duration)
+        if max_duration is not None:
+            clauses.append("duration <= ?")
+            params.append(max_duration)
+
+        sql = "SELECT path, song, stem_type, samplerate, frames, channels, duration FROM stems"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY path"
+
+        return [
+            CatalogEntry(path, song, StemType(stem_type), samplerate, frames, channels, duration)
+            for path, song, stem_type, samplerate, frames, channels, duration in self.connection.execute(sql, params)
+        ]
+
+    def songs(self, store=None, audio_cache=None, **filters):
+        """
+        Songs built from the entries matching filters (see query), with each Stem's
+        header info filled in from the catalog.
+        """
+        stems = [
+            Stem(
+                entry.song, entry.stem_type, entry.path, store=store, audio_cache=audio_cache,
+                info=AudioInfo(entry.samplerate, entry.frames, entry.channels)
+            )
+            for entry in self.query(**filters)
+        ]
+        return group_into_songs(stems)
+
+
+def _under_root_clause():
+    return "substr(path, 1, ?) = ?"
+
+
+def _under_root_params(root):
+    prefix = os.path.join(root, "")  # trailing separator, so /a/b does not match /a/bc
+    return [len(prefix), prefix]
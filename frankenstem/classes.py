@@ -1,5 +1,6 @@
 from enum import Enum
-from frankenstem.audio_io import load_audio
+import numpy as np
+from frankenstem.audio_io import load_audio, audio_info, read_audio_ranges, iter_audio_blocks
 
 class StemType(Enum):
     VOCALS = "Vocals"
@@ -8,21 +9,78 @@ class StemType(Enum):
     OTHER = "Other"
 
 class Stem:
-    def __init__(self, song_name: str, stem_type: StemType, filepath: str):
+    def __init__(self, song_name: str, stem_type: StemType, filepath: str, store=None, info=None, audio_cache=None):
         self.song_name = song_name
         self.stem_type = stem_type
         self.filepath = filepath
+        self.store = store  # optional StemStore holding a pre-decoded copy
+        self.audio_cache = audio_cache  # optional DecodedAudioCache holding decoded audio instead of self._audio
         self._audio = None
         self._sr = None
+        self._info = info if store is None else None  # AudioInfo already known, e.g. from a LibraryCatalog
 
     def load_audio(self): #prevents loading audio multiple times
+        if self.audio_cache is not None and self.store is None:
+            return self._load_cached_audio()
+
         if self._audio is None:
-            self._audio, self._sr = load_audio(self.filepath)
+            if self.store is not None:
+                self._audio, self._sr = self.store.load(self.filepath)
+            else:
+                self._audio, self._sr = load_audio(self.filepath)
 
             if len(self._audio) == 0:
                 raise ValueError(f"Audio file '{self.filepath}' is empty or could not be loaded.")
         return self._audio, self._sr
 
+    def _load_cached_audio(self):
+        """
+        Decoded audio through the shared cache, which may drop it again under memory
+        pressure. Audio stored as float16 is handed out as a float32 copy.
+        """
+        entry = self.audio_cache.get(self.filepath)
+        if entry is None:
+            audio, sr = load_audio(self.filepath)
+            if len(audio) == 0:
+                raise ValueError(f"Audio file '{self.filepath}' is empty or could not be loaded.")
+            entry = self.audio_cache.put(self.filepath, audio, sr)
+        audio, sr = entry
+        return audio.astype(np.float32, copy=False), sr
+
+    def _resident_audio(self):
+        """
+        Audio already in memory (or memory-mapped), or None if reading means seeking the file.
+        """
+        if self.store is not None:
+            return self.load_audio()[0]
+        if self.audio_cache is not None:
+            entry = self.audio_cache.get(self.filepath)
+            return None if entry is None else entry[0]
+        return self._audio
+
+    def load_info(self): # header only, no decoding
+        if self._info is None:
+            self._info = self.store.info(self.filepath) if self.store is not None else audio_info(self.filepath)
+        return self._info
+
+    def read_ranges(self, ranges):
+        audio = self._resident_audio()  # memory-mapped when stored, only the ranges are paged in
+        if audio is None:
+            return read_audio_ranges(self.filepath, ranges)
+        return [audio[..., start:end].astype(np.float32, copy=False) for start, end in ranges]
+
+    def iter_blocks(self, start, end, block_size):
+        audio = self._resident_audio()
+        if audio is None:
+            yield from iter_audio_blocks(self.filepath, start, end, block_size)
+            return
+        for block_start in range(start, end, block_size):
+            yield audio[..., block_start:min(block_start + block_size, end)].astype(np.float32, copy=False)
+
+    def release_audio(self):
+        self._audio = None
+        self._sr = None  # a cached copy stays until the cache evicts it
+
 class Song:
     def __init__(self, name: str):
         self.name = name
@@ -1,32 +1,12 @@
-import librosa
-import numpy as np
-import random 
+from frankenstem.assembly import assemble
 
-def combine_segments(segments_a, segments_b, sr=22050):
-    """
-    Combine segments from two lists of audio segments into a single list.
-    Each segment is randomly chosen from either list, for  total audio length of 20 seconds.
 
-    Returns a list of combined audio segments.
+def combine_segments(*segment_lists, sr=22050, duration=20.0, rng=None):
     """
+    Combine segments from any number of lists of audio segments into a single array.
+    Each segment is randomly chosen from a randomly chosen list, for a total audio length
+    of duration seconds at sr (the last segment is trimmed to fit).
 
-    sources = {
-        'a': segments_a,
-        'b': segments_b
-    }
-    combined_segments = []
-    total_length = 0
-    max_length = 20 * sr  # 20 seconds at 22050 Hz (length in samples)
-
-    while total_length < max_length:
-        source = random.choice(list(sources.keys()))
-        segment = random.choice(sources[source])
-        remaining = max_length - total_length
-
-        segment = segment if len(segment) <= remaining else segment[:remaining]
-        combined_segments.append(segment)
-        total_length += len(segment)
-    
-    return combined_segments
-    
-    
\ No newline at end of file
+    Returns the combined audio, (n,) or (channels, n).
+    """
+    return assemble(segment_lists, int(duration * sr), rng)
@@ -1,5 +1,12 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+import soundfile as sf
 from frankenstem.classes import StemType
+from frankenstem.splicer import slice_into_random_beats, slice_by_transients
+
+SLICING_FUNCTIONS = {
+    "beats": slice_into_random_beats,
+    "transients": slice_by_transients
+}
 
 @dataclass
 class FrankenstemConfig:
@@ -12,11 +19,93 @@ class FrankenstemConfig:
     export_fragments_individually: bool = False
     filter_by_energy: bool = False
     energy_target: str = "low"  # or "high"
+    analysis_cache_dir: str | None = None  # reuse beat/onset/silence analysis across runs
+    analysis_cache_max_mb: float = 512
+    feature_cache_max_mb: float = 1024  # spectral features for selection_mode="similar", budgeted apart from the analyses
+    num_workers: int = 1  # > 1 loads and analyzes stems in a process pool, slicing stays in this process
+    seed: int | None = None  # fixes shuffling and slicing for reproducible output
+    stem_store_dir: str | None = None  # keep pre-decoded, memory-mapped copies of the stems here
+    sample_rate: int | None = None  # stem store rate, defaults to the most common rate in the library
+    audio_cache_mb: float | None = None  # keep decoded stems in memory up to this budget, least recently used dropped first
+    audio_cache_dtype: str = "float32"  # or "float16": twice the audio per budget at reduced precision
+    output_format: str = "wav"  # or "flac", also used for individually exported fragments
+    output_subtype: str | None = None  # e.g. "PCM_16", "PCM_24", "FLOAT"; None for the format's default
+    export_threads: int = 4  # threads writing individually exported fragments
+    fragment_index: str | None = "csv"  # "csv", "json" or None: index of exported fragments and their sources
+    write_manifest: bool = False  # write a JSON manifest next to each render, see render_from_manifest
+    profile_path: str | None = None  # write per-stage/per-stem timings here as a Chrome trace
+    beat_mode: str = "track"  # "grid" skips beat tracking for stems already normalised to bpm
+    analysis_sr: int | None = None  # e.g. 11025 or 22050: run beat/onset detection on a decimated mono copy
+    catalog_path: str | None = None  # SQLite library catalog; scans the input folder recursively and incrementally
+    selection_mode: str = "random"  # "similar": segments timbrally closest to a random seed segment
+    song_analysis: bool = False  # analyze each song's stems together on one shared beat grid
+    tempo_cache_dir: str | None = None  # time-stretch every song to bpm first, keeping the stretched copies here
+    source_bpms: dict[str, float] | None = None  # song name -> source tempo; songs not listed are detected
 
     def __post_init__(self):
         if self.min_beats >= self.max_beats:
             raise ValueError("min_beats must be less than max_beats")
 
+        if self.num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+
+        if self.output_format not in ("wav", "flac"):
+            raise ValueError("output_format must be 'wav' or 'flac'")
+
+        if self.output_subtype is not None and not sf.check_format(self.output_format.upper(), self.output_subtype):
+            raise ValueError(f"output_subtype '{self.output_subtype}' is not supported by {self.output_format}")
+
+        if self.audio_cache_mb is not None and self.audio_cache_mb <= 0:
+            raise ValueError("audio_cache_mb must be positive")
+
+        if self.audio_cache_dtype not in ("float32", "float16"):
+            raise ValueError("audio_cache_dtype must be 'float32' or 'float16'")
+
+        if self.export_threads < 1:
+            raise ValueError("export_threads must be at least 1")
+
+        if self.selection_mode not in ("random", "similar"):
+            raise ValueError("selection_mode must be 'random' or 'similar'")
+
+        if self.fragment_index not in (None, "csv", "json"):
+            raise ValueError("fragment_index must be 'csv', 'json' or None")
+
+        if self.beat_mode not in ("track", "grid"):
+            raise ValueError("beat_mode must be 'track' or 'grid'")
+
+        if self.source_bpms and any(tempo <= 0 for tempo in self.source_bpms.values()):
+            raise ValueError("source_bpms must be positive")
+
+        if self.analysis_sr is not None and self.analysis_sr <= 0:
+            raise ValueError("analysis_sr must be positive")
+
         if self.filter_by_energy and self.energy_target not in ("low", "high", 'medium', "very_low"):
             raise ValueError("energy_target must be 'very_low', 'low', 'medium' or 'high'")
 
+
+
+def config_from_dict(values):
+    """
+    Builds a FrankenstemConfig from plain values (e.g. parsed JSON).
+    Stem types are given by name ("vocals", "Drums"...), the slicing function as
+    "slicing": "beats" or "transients".
+    """
+    values = dict(values)
+    slicing = values.pop("slicing", "beats")
+    if slicing not in SLICING_FUNCTIONS:
+        raise ValueError("slicing must be 'beats' or 'transients'")
+
+    values["selected_stem_types"] = [StemType[name.upper()] for name in values.get("selected_stem_types", [])]
+    values["selected_slicing_function"] = SLICING_FUNCTIONS[slicing]
+    return FrankenstemConfig(**values)
+
+
+def config_to_dict(config):
+    """
+    Inverse of config_from_dict: plain, JSON-serializable values.
+    """
+    values = asdict(config)
+    slicing_names = {function: name for name, function in SLICING_FUNCTIONS.items()}
+    values["selected_stem_types"] = [stem_type.name.lower() for stem_type in config.selected_stem_types]
+    values["slicing"] = slicing_names.get(values.pop("selected_slicing_function"), "unknown")
+    return values
@@ -1,5 +1,4 @@
 import numpy as np
-import librosa
 
 def compute_energy(audio):
     """
@@ -11,37 +10,93 @@ def compute_energy(audio):
     return np.sqrt(np.mean(audio**2))
 
 
-def filter_segments_by_energy(segments, target='low'):
+class RunningEnergyStats:
     """
-    Filters segments by RMS energy, using the median as threshold.
-    Returns segments that are either 'low' or 'high' energy.
+    Online (Welford) mean and standard deviation of segment energies, updated one batch
+    at a time, so thresholds can be computed over libraries whose segments never all
+    sit in memory at once.
     """
-    scores = [compute_energy(seg) for seg in segments]
 
-    mean_score = np.mean(scores)
-    std_score = np.std(scores)
-    median_score = np.median(scores)
-    print(f"[DEBUG] Energy mean: {mean_score:.5f}, median: {median_score:.5f}")
-    threshold = None
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean
+
+    def update(self, scores):
+        scores = np.asarray(scores, dtype=np.float64)
+        if scores.size == 0:
+            return
+
+        # merge the batch's own mean/M2 into the running totals (Chan et al.)
+        batch_count = scores.size
+        batch_mean = scores.mean()
+        batch_m2 = np.sum((scores - batch_mean)**2)
+
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_count / total
+        self._m2 += batch_m2 + delta**2 * self.count * batch_count / total
+        self.count = total
+
+    @property
+    def std(self):
+        return np.sqrt(self._m2 / self.count) if self.count else 0.0
+
+
+def energy_mask(scores, mean_score, std_score, target='low'):
+    """
+    Vectorized energy test: True for each score that falls in the target band
+    around mean_score / std_score.
+    """
+    scores = np.asarray(scores)
 
     # make a map to handle different energy targets
 
     if target == 'low':
         threshold = mean_score - 2 * std_score
-        filtered = [seg for seg, score in zip(segments, scores) if score < threshold]
+        return scores < threshold
     elif target == 'very_low':
         threshold = mean_score - 1.5 * std_score
-        filtered = [seg for seg, score in zip(segments, scores) if score < threshold]
+        return scores < threshold
     elif target == 'medium':
         lower = mean_score - std_score
         upper = mean_score + std_score
-        filtered = [seg for seg, score in zip(segments, scores) if lower <= score <= upper]
         print(f"[DEBUG] Energy medium range: {lower:.5f} to {upper:.5f}")
+        return (lower <= scores) & (scores <= upper)
     elif target == 'high':
         threshold = mean_score + std_score
-        filtered = [seg for seg, score in zip(segments, scores) if score > threshold]
+        return scores > threshold
     else:
         raise ValueError("target must be 'low', 'very_low', 'medium' or 'high'")
 
+
+def filter_segments_by_energy(segments, target='low', scores=None, stats=None):
+    """
+    Filters segments by RMS energy, using the median as threshold.
+    Returns segments that are either 'low' or 'high' energy.
+    Pass scores to reuse energies already computed from a StemAnalysis, and stats
+    (a RunningEnergyStats) to threshold against statistics gathered elsewhere,
+    e.g. streamed over a whole library. A SegmentTable is filtered with its mask directly.
+    """
+    if scores is None:
+        scores = [compute_energy(seg) for seg in segments]
+    scores = np.asarray(scores, dtype=np.float64)
+
+    if stats is not None:
+        mean_score = stats.mean
+        std_score = stats.std
+        print(f"[DEBUG] Energy mean: {mean_score:.5f}, std: {std_score:.5f} (over {stats.count} segments)")
+    else:
+        mean_score = np.mean(scores)
+        std_score = np.std(scores)
+        median_score = np.median(scores)
+        print(f"[DEBUG] Energy mean: {mean_score:.5f}, median: {median_score:.5f}")
+
+    mask = energy_mask(scores, mean_score, std_score, target)
+    if isinstance(segments, list):
+        filtered = [seg for seg, keep in zip(segments, mask) if keep]
+    else:
+        filtered = segments[mask]
+
     print(f"[INFO] Filtered down to {len(filtered)} of {len(segments)} segments.")
     return filtered
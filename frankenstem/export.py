@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import csv
+import json
+import os
+import numpy as np
+import soundfile as sf
+from frankenstem.progress import GenerationCancelled, check_cancelled, report_progress
+
+DEFAULT_BLOCK_SIZE = 65536  # frames per write
+DEFAULT_EXPORT_THREADS = 4
+DEFAULT_MAX_IN_FLIGHT_BYTES = 64 * 1024 * 1024  # decoded fragment audio held by the export threads at once
+CANCEL_POLL_SECONDS = 0.1  # how often waiting for running fragments checks the cancel token
+FRAGMENT_INDEX_FIELDS = ["file", "song", "stem_type", "source", "start", "end", "duration", "energy"]
+
+
+def write_segments(output_file, segments, sr, block_size=DEFAULT_BLOCK_SIZE, format=None, subtype=None,
+                   progress=None, cancel_token=None):
+    """
+    Streams SegmentDescriptors into one audio file, in order, reading and writing
+    at most block_size frames at a time. Peak memory is one block, whatever the
+    total duration. The container follows the file extension (e.g. .wav, .flac)
+    unless format is given.
+
+    progress(done, total, "export") is called after each segment, and cancel_token is
+    checked between segments; a cancelled export removes the partial file.
+
+    Returns the number of frames written.
+    """
+    channels = max(segment.stem.load_info().channels for segment in segments)
+    frames_written = 0
+
+    try:
+        with sf.SoundFile(output_file, 'w', samplerate=sr, channels=channels, format=format, subtype=subtype) as f:
+            for done, segment in enumerate(segments, 1):
+                check_cancelled(cancel_token)
+                for block in segment.stem.iter_blocks(segment.start, segment.end, block_size):
+                    if block.ndim == 1 and channels > 1:
+                        block = np.repeat(block[np.newaxis, :], channels, axis=0)  # mono stem in a stereo mix
+                    f.write(block.T if block.ndim == 2 else block)
+                    frames_written += block.shape[-1]
+                report_progress(progress, done, len(segments), "export")
+    except GenerationCancelled:
+        os.remove(output_file)
+        raise
+
+    return frames_written
+
+
+def write_fragments(folder, segments, sr, format="wav", subtype=None, num_threads=DEFAULT_EXPORT_THREADS,
+                    max_in_flight_bytes=DEFAULT_MAX_IN_FLIGHT_BYTES, progress=None, cancel_token=None):
+    """
+    Writes every segment to its own file in folder (fragment_001.wav, ...) through a
+    pool of num_threads threads, so reads, encoding and file creation overlap.
+    format is the container and file extension ("wav" or "flac"), subtype e.g.
+    "PCM_16" or "PCM_24" (the container's default when None). New fragments are only
+    started while the audio held by running ones stays under max_in_flight_bytes.
+
+    progress(done, total, "export") is called as fragments finish; cancel_token is
+    checked before each fragment is started and while waiting for running ones.
+    On cancellation fragments not started yet are dropped, fragments already written
+    are kept.
+
+    Returns: list of fragment paths, in segment order
+    """
+    os.makedirs(folder, exist_ok=True)
+    segments = list(segments)
+    paths = [os.path.join(folder, f"fragment_{i + 1:03d}.{format}") for i in range(len(segments))]
+
+    def write_fragment(i):
+        segment = segments[i]
+        audio = segment.stem.read_ranges([(segment.start, segment.end)])[0]
+        sf.write(paths[i], audio.T if audio.ndim == 2 else audio, sr, format=format, subtype=subtype)
+
+    pending = {}  # future -> bytes it holds
+    in_flight = 0
+    done = 0
+
+    def wait_for_some():
+        nonlocal in_flight, done
+        check_cancelled(cancel_token)
+        finished, _ = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+        for future in finished:
+            future.result()
+            in_flight -= pending.pop(future)
+            done += 1
+            report_progress(progress, done, len(segments), "export")
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        try:
+            for i, segment in enumerate(segments):
+                check_cancelled(cancel_token)
+                size = segment.length * segment.stem.load_info().channels * 4  # float32
+                # always let one fragment through, however large
+                while pending and (len(pending) >= 2 * num_threads or in_flight + size > max_in_flight_bytes):
+                    wait_for_some()
+
+                pending[executor.submit(write_fragment, i)] = size
+                in_flight += size
+
+            while pending:
+                wait_for_some()
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+    return paths
+
+
+def write_fragment_index(index_path, fragment_paths, segments, sr):
+    """
+    Describes each fragment (file, source song/stem/path, sample range, duration,
+    energy) as CSV or JSON, picked by the extension of index_path.
+    """
+    rows = [
+        {
+            "file": os.path.basename(path),
+            "song": segment.stem.song_name,
+            "stem_type": segment.stem.stem_type.value,
+            "source": os.path.abspath(segment.stem.filepath),
+            "start": segment.start,
+            "end": segment.end,
+            "duration": round(segment.length / sr, 6),
+            "energy": segment.energy
+        }
+        for path, segment in zip(fragment_paths, segments)
+    ]
+
+    if index_path.endswith(".json"):
+        with open(index_path, "w") as f:
+            json.dump({"sample_rate": sr, "fragments": rows}, f, indent=2)
+    else:
+        with open(index_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FRAGMENT_INDEX_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    return index_path
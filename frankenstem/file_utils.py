@@ -0,0 +1,29 @@
+from contextlib import contextmanager
+import os
+import tempfile
+
+
+def file_signature(filepath):
+    """
+    Identifies the current version of a file by its absolute path, mtime and size.
+    """
+    stat = os.stat(filepath)
+    return f"{os.path.abspath(filepath)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+@contextmanager
+def atomic_write(path, mode="wb"):
+    """
+    Opens a temporary file next to path for writing and renames it to path once the
+    block finishes, so readers (and other processes writing the same entry) never
+    see a partial file. The temporary file is removed if the block raises.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -1,3 +1,4 @@
+import os
 import re
 from frankenstem.classes import Stem, StemType, Song
 from pathlib import Path
@@ -25,20 +26,36 @@ def parse_filename(filename):
     return song_name, stem_map[raw_stem_type]
 
 
-def load_wavs_from_folder(input_path):
+def load_wavs_from_folder(input_path, store=None, audio_cache=None):
     input_path = Path(input_path)
-    songs_by_name = {}
+    stems = []
 
-    for filepath in input_path.glob("*.wav"):
+    for filepath in sorted(input_path.glob("*.wav")):
         try:
             song_name, stem_type = parse_filename(filepath.name)
-            stem = Stem(song_name, stem_type, str(filepath))
-            song = songs_by_name.setdefault(song_name, Song(song_name))
-            song.add_stem(stem)
+            stems.append(Stem(song_name, stem_type, str(filepath), store=store, audio_cache=audio_cache))
         except ValueError as e:
             print(f"Skipping '{filepath.name}': {e}")
             continue
 
+    return group_into_songs(stems)
+
+
+def group_into_songs(stems):
+    """
+    Groups stems into Songs by song name, in order of first appearance.
+    Requires at least two distinct songs.
+    """
+    songs_by_name = {}
+
+    for stem in stems:
+        try:
+            song = songs_by_name.setdefault(stem.song_name, Song(stem.song_name))
+            song.add_stem(stem)
+        except ValueError as e:
+            print(f"Skipping '{os.path.basename(stem.filepath)}': {e}")
+            continue
+
     # make sure that there are at least two distinct songs with stems
     songs = list(songs_by_name.values()) 
     if len(songs) < 2:
@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+import json
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+@dataclass
+class Span:
+    """
+    One finished timing span. start is wall-clock time (seconds since the epoch),
+    so spans recorded in worker processes line up with the parent's.
+    """
+    name: str
+    start: float
+    duration: float
+    depth: int
+    parent: str | None = None
+    meta: dict = field(default_factory=dict)
+    pid: int = 0
+    tid: int = 0
+    max_rss_mb: float | None = None  # peak resident memory of the process at the end of the span
+
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1 if os.uname().sysname == "Darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+class Profiler:
+    """
+    Records nested timing spans (scan, decode, beat tracking, slicing, export...) per stem
+    and per run, with peak-memory samples. Every finished span is passed to each hook
+    (a callable taking a Span) as it completes; the whole record can be written out as
+    JSON or as a Chrome trace (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self, hooks=None):
+        self.spans = []
+        self.hooks = list(hooks or [])
+        self._local = threading.local()
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, **meta):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        start = time.time()
+        perf_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - perf_start
+            stack.pop()
+            self.record(Span(
+                name=name,
+                start=start,
+                duration=duration,
+                depth=len(stack),
+                parent=parent,
+                meta=meta,
+                pid=os.getpid(),
+                tid=threading.get_ident(),
+                max_rss_mb=max_rss_mb()
+            ))
+
+    def record(self, span):
+        self.spans.append(span)
+        for hook in self.hooks:
+            hook(span)
+
+    def merge(self, spans, depth_offset=None, parent=None):
+        """
+        Adds spans recorded elsewhere (e.g. in a worker process), nested under the current span.
+        """
+        stack = self._stack()
+        offset = len(stack) if depth_offset is None else depth_offset
+        for span in spans:
+            span.depth += offset
+            if span.parent is None:
+                span.parent = parent or (stack[-1] if stack else None)
+            self.record(span)
+
+    def summary(self):
+        """
+        Total seconds and call count per span name, plus the highest memory sample.
+        """
+        totals = {}
+        for span in self.spans:
+            entry = totals.setdefault(span.name, {"seconds": 0.0, "count": 0, "max_rss_mb": None})
+            entry["seconds"] += span.duration
+            entry["count"] += 1
+            if span.max_rss_mb is not None:
+                entry["max_rss_mb"] = max(entry["max_rss_mb"] or 0.0, span.max_rss_mb)
+        return totals
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump({"summary": self.summary(), "spans": [asdict(span) for span in self.spans]}, f, indent=2)
+
+    def write_chrome_trace(self, path):
+        events = []
+        for span in self.spans:
+            events.append({
+                "name": span.name,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": span.pid,
+                "tid": span.tid,
+                "args": {key: str(value) for key, value in span.meta.items()}
+            })
+            if span.max_rss_mb is not None:
+                events.append({
+                    "name": "max_rss_mb",
+                    "ph": "C",
+                    "ts": (span.start + span.duration) * 1e6,
+                    "pid": span.pid,
+                    "args": {"max_rss_mb": span.max_rss_mb}
+                })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+class NullProfiler(Profiler):
+    """
+    Drop-in Profiler that records nothing, used when no profiler is passed.
+    """
+
+    @contextmanager
+    def span(self, name, **meta):
+        yield
+
+    def merge(self, spans, depth_offset=None, parent=None):
+        pass
+
+
+def print_span(span, max_depth=0):
+    """
+    Hook printing finished spans up to max_depth as [PROFILE] lines.
+    """
+    if span.depth <= max_depth:
+        print(f"[PROFILE] {span.name} took: {span.duration:.2f}s")
@@ -0,0 +1,47 @@
+import json
+from frankenstem.config import config_from_dict
+
+
+def load_job_file(job_path):
+    """
+    Reads a batch job file (JSON) and expands it into one FrankenstemConfig per render.
+
+    Format:
+    {
+        "input_path": "input",
+        "output_path": "output",
+        "base": {"target_duration": 10, "bpm": 160, "selected_stem_types": ["vocals", "other"],
+                 "slicing": "beats", "min_beats": 2, "max_beats": 4},
+        "variations": [{"target_duration": 30}, {"filter_by_energy": true, "energy_target": "high"}],
+        "seeds": [1, 2, 3]
+    }
+
+    Each variation overrides fields of "base"; every variation is rendered once per seed.
+    Without "variations" the base config is rendered once per seed.
+
+    Returns: (input_path, output_path, list of FrankenstemConfig)
+    """
+    with open(job_path) as f:
+        job = json.load(f)
+    return expand_job(job)
+
+
+def expand_job(job):
+    """
+    Expands an already parsed job (see load_job_file for the format).
+
+    Returns: (input_path, output_path, list of FrankenstemConfig)
+    """
+    base = job.get("base", {})
+    variations = job.get("variations") or [{}]
+    seeds = job.get("seeds")
+
+    configs = []
+    for variation in variations:
+        values = {**base, **variation}
+        if seeds is None:
+            configs.append(config_from_dict(values))
+        else:
+            configs.extend(config_from_dict({**values, "seed": seed}) for seed in seeds)
+
+    return job.get("input_path", "input"), job.get("output_path", "output"), configs
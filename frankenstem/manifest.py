@@ -0,0 +1,88 @@
+from datetime import datetime
+import json
+import os
+from frankenstem.classes import Stem, StemType
+from frankenstem.config import config_to_dict
+from frankenstem.export import write_segments
+from frankenstem.segment_index import SegmentDescriptor, select_up_to_duration
+from frankenstem.stem_store import StemStore
+
+MANIFEST_VERSION = 1
+
+
+def write_manifest(manifest_path, segments, config, sr, output):
+    """
+    Records what went into a render: the config, and for every segment in output order
+    its source stem, sample range and energy. Positions are at sr, the stem store
+    rate when the render read from a stem store.
+    """
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "output": os.path.abspath(output),
+        "sample_rate": sr,
+        "config": config_to_dict(config),
+        "segments": [
+            {
+                "path": os.path.abspath(segment.stem.filepath),
+                "song": segment.stem.song_name,
+                "stem_type": segment.stem.stem_type.value,
+                "start": segment.start,
+                "end": segment.end,
+                "energy": segment.energy
+            }
+            for segment in segments
+        ]
+    }
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
+def load_manifest(manifest_path):
+    """
+    Returns: (list of SegmentDescriptor, sample_rate, manifest dict)
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version: {manifest.get('version')}")
+
+    sr = manifest["sample_rate"]
+    store = None
+    store_dir = manifest["config"].get("stem_store_dir")
+    if store_dir:
+        store = StemStore(store_dir, sample_rate=sr)
+
+    stems = {}
+    segments = []
+    for entry in manifest["segments"]:
+        if entry["path"] not in stems:
+            stems[entry["path"]] = Stem(entry["song"], StemType(entry["stem_type"]), entry["path"], store=store)
+        segments.append(SegmentDescriptor(stems[entry["path"]], entry["start"], entry["end"], entry.get("energy")))
+
+    return segments, sr, manifest
+
+
+def render_from_manifest(manifest_path, output_file, target_duration=None, subtype=None):
+    """
+    Rebuilds a render from its manifest by reading only the listed sample ranges:
+    no beat tracking, onset detection or full decode. The container follows the
+    extension of output_file, so a take can be re-exported as e.g. FLAC, and
+    target_duration (seconds) can shorten it.
+
+    Returns the number of frames written.
+    """
+    segments, sr, _ = load_manifest(manifest_path)
+
+    if target_duration is not None:
+        segments = select_up_to_duration(segments, int(target_duration * sr))
+
+    if not segments:
+        raise ValueError(f"Manifest '{manifest_path}' lists no segments.")
+
+    frames = write_segments(output_file, segments, sr, subtype=subtype)
+    print(f"Saved Frankenstem to {output_file}")
+    return frames
@@ -0,0 +1,150 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from frankenstem.analysis import StemAnalysis, analyze_features_file, analyze_stem_file, analyze_song_files
+from frankenstem.analysis_cache import AnalysisCache
+from frankenstem.classes import Stem
+from frankenstem.instrumentation import Profiler, NullProfiler
+
+
+@dataclass
+class AnalysisJob:
+    """
+    Everything a worker process needs to load and analyze one stem.
+    Only holds picklable values, so jobs can be sent to a process pool.
+    """
+    stem: Stem
+    bpm: float
+    analysis_cache: AnalysisCache | None = None
+    profile: bool = False  # record timing spans and send them back with the analysis
+    beat_mode: str = "track"  # or "grid", see analyze_stem
+    analysis_sr: int | None = None  # decimate the analysis mix to this rate
+    features: bool = False  # also compute spectral features for similarity selection
+    onsets: bool = True  # only needed for transient slicing
+
+
+def analyze_job(job: AnalysisJob):
+    """
+    Loads and analyzes one stem. No audio is kept or sent back, only the StemAnalysis
+    and, when job.profile is set, the timing spans recorded while doing it.
+
+    Returns: (StemAnalysis, list of Span)
+    """
+    profiler = Profiler() if job.profile else NullProfiler()
+
+    with profiler.span("stem", stem=job.stem.filepath, stem_type=job.stem.stem_type.value):
+        analysis = analyze_stem_file(
+            job.stem,
+            job.bpm,
+            cache=job.analysis_cache.for_file(job.stem.filepath) if job.analysis_cache else None,
+            profiler=profiler,
+            beat_mode=job.beat_mode,
+            analysis_sr=job.analysis_sr,
+            features=job.features,
+            onsets=job.onsets
+        )
+    return analysis, profiler.spans
+
+
+@dataclass
+class SongAnalysisJob:
+    """
+    Like AnalysisJob, for all stems of one song analyzed together on a shared beat grid.
+    """
+    stems: list[Stem]
+    bpm: float
+    analysis_cache: AnalysisCache | None = None
+    profile: bool = False
+    beat_mode: str = "track"
+    analysis_sr: int | None = None
+    features: bool = False
+    per_stem_onsets: bool = True  # only needed for transient slicing
+
+
+def analyze_song_job(job: SongAnalysisJob):
+    """
+    Loads and analyzes the stems of one song together, see analyze_song.
+
+    Returns: (list of StemAnalysis, list of Span)
+    """
+    profiler = Profiler() if job.profile else NullProfiler()
+
+    with profiler.span("song", song=job.stems[0].song_name, stems=len(job.stems)):
+        analyses = analyze_song_files(
+            job.stems,
+            job.bpm,
+            analysis_cache=job.analysis_cache,
+            profiler=profiler,
+            beat_mode=job.beat_mode,
+            analysis_sr=job.analysis_sr,
+            features=job.features,
+            per_stem_onsets=job.per_stem_onsets
+        )
+    return analyses, profiler.spans
+
+
+@dataclass
+class FeatureJob:
+    """
+    Adds spectral features to a stem analysis that was computed without them.
+    """
+    stem: Stem
+    analysis: StemAnalysis
+    analysis_cache: AnalysisCache | None = None
+    profile: bool = False
+    analysis_sr: int | None = None  # the rate the analysis ran at, see effective_analysis_sr
+
+
+def feature_job(job: FeatureJob):
+    """
+    Loads one stem (unless its features are cached) and computes only its features.
+
+    Returns: (StemAnalysis with feature_prefix, list of Span)
+    """
+    profiler = Profiler() if job.profile else NullProfiler()
+
+    with profiler.span("stem", stem=job.stem.filepath, stem_type=job.stem.stem_type.value):
+        feature_prefix = analyze_features_file(
+            job.stem,
+            hop_length=job.analysis.hop_length,
+            cache=job.analysis_cache.for_file(job.stem.filepath) if job.analysis_cache else None,
+            profiler=profiler,
+            analysis_sr=job.analysis_sr
+        )
+    return replace(job.analysis, feature_prefix=feature_prefix), profiler.spans
+
+
+def run_job(job):
+    """
+    Runs an AnalysisJob, SongAnalysisJob or FeatureJob.
+
+    Returns: (list of (Stem, StemAnalysis), list of Span)
+    """
+    if isinstance(job, SongAnalysisJob):
+        analyses, spans = analyze_song_job(job)
+        return list(zip(job.stems, analyses)), spans
+    if isinstance(job, FeatureJob):
+        analysis, spans = feature_job(job)
+        return [(job.stem, analysis)], spans
+    analysis, spans = analyze_job(job)
+    return [(job.stem, analysis)], spans
+
+
+def iter_stem_analyses(jobs, num_workers=1):
+    """
+    Runs AnalysisJobs, SongAnalysisJobs or FeatureJobs and yields (stem, StemAnalysis,
+    spans) per stem, in job order, as results become available. A song job's spans
+    come with its first stem. With num_workers > 1 the jobs are fanned out over a process pool.
+    """
+    if num_workers <= 1:
+        results = map(run_job, jobs)
+    else:
+        executor = ProcessPoolExecutor(max_workers=num_workers)
+        results = executor.map(run_job, jobs)
+
+    try:
+        for analyses, spans in results:
+            for i, (stem, analysis) in enumerate(analyses):
+                yield stem, analysis, spans if i == 0 else []
+    finally:
+        if num_workers > 1:
+            executor.shutdown(cancel_futures=True)
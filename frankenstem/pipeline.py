@@ -0,0 +1,506 @@
+from collections import OrderedDict
+from datetime import datetime
+import os
+import random
+import numpy as np
+from frankenstem.analysis import effective_analysis_sr
+from frankenstem.analysis_cache import AnalysisCache
+from frankenstem.audio_cache import DecodedAudioCache
+from frankenstem.catalog import LibraryCatalog
+from frankenstem.energy_filter import filter_segments_by_energy, RunningEnergyStats
+from frankenstem.export import write_segments, write_fragments, write_fragment_index, DEFAULT_BLOCK_SIZE
+from frankenstem.filename_parser import load_wavs_from_folder
+from frankenstem.instrumentation import NullProfiler
+from frankenstem.manifest import write_manifest
+from frankenstem.parallel import AnalysisJob, FeatureJob, SongAnalysisJob, iter_stem_analyses
+from frankenstem.progress import check_cancelled, report_progress
+from frankenstem.segment_index import SegmentTable
+from frankenstem.splicer import slice_into_random_beats, slice_by_transients, beat_slice_ranges, transient_slice_ranges
+from frankenstem.stem_store import StemStore
+from frankenstem.tempo import TempoNormalizer
+
+# slicing functions work on a shared StemAnalysis through their range counterparts
+SLICE_RANGES = {
+    slice_into_random_beats: beat_slice_ranges,
+    slice_by_transients: transient_slice_ranges
+}
+MAX_SEGMENT_POOLS = 8  # pools depend on the seeds, so unseeded renders would never reuse one
+
+
+def needs_features(config):
+    return config.selection_mode == "similar"
+
+
+def slice_params(config):
+    params = {
+        slice_into_random_beats: {
+            "min_beats": config.min_beats,
+            "max_beats": config.max_beats
+        },
+        slice_by_transients: {
+            "delta": 0.5,
+            "min_length_seconds": 0.5
+        }
+    }
+    return params[config.selected_slicing_function]
+
+
+class StemLibrary:
+    """
+    The songs of an input folder plus every stem analysis computed so far. Kept in memory
+    so that several renders (seeds, durations, stem selections...) share one folder scan
+    and one analysis pass per stem.
+    """
+
+    def __init__(self, songs, store=None, analysis_cache=None, num_workers=1):
+        self.songs = songs
+        self.store = store
+        self.analysis_cache = analysis_cache
+        self.num_workers = num_workers
+        self._analyses = {}  # (filepath, analysis settings) -> StemAnalysis
+        self._pools = OrderedDict()  # slicing settings -> (segments, sr, energy stats), least recently used first
+
+        if store is not None:
+            # fix the shared rate before fanning out, stems at other rates get resampled copies
+            store.harmonize([stem for song in songs for stem in song.stems.values()])
+
+    @classmethod
+    def from_folder(cls, input_path, config, profiler=None):
+        profiler = profiler or NullProfiler()
+
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Input path '{input_path}' does not exist.")
+
+        store = None
+        if config.stem_store_dir:
+            store = StemStore(config.stem_store_dir, sample_rate=config.sample_rate)
+
+        audio_cache = None
+        if config.audio_cache_mb and store is None:  # stored stems are memory-mapped, the OS pages them instead
+            audio_cache = DecodedAudioCache(
+                max_bytes=int(config.audio_cache_mb * 1024 * 1024),
+                dtype=config.audio_cache_dtype
+            )
+
+        analysis_cache = None
+        if config.analysis_cache_dir:
+            analysis_cache = AnalysisCache(
+                config.analysis_cache_dir,
+                max_bytes=int(config.analysis_cache_max_mb * 1024 * 1024),
+                kind_budgets={"features": int(config.feature_cache_max_mb * 1024 * 1024)}
+            )
+
+        with profiler.span("scan", input_path=str(input_path)):
+            if config.catalog_path:
+                # recursive, header-only and incremental: unchanged files are not even opened
+                with LibraryCatalog(config.catalog_path) as catalog:
+                    scan = catalog.scan(input_path)
+                    print(f"[DEBUG] Catalog scan: {scan.added} added, {scan.updated} updated, "
+                          f"{scan.removed} removed, {scan.unchanged} unchanged")
+                    songs = catalog.songs(store=store, audio_cache=audio_cache, root=input_path)
+            else:
+                songs = load_wavs_from_folder(input_path, store=store, audio_cache=audio_cache)
+        print(f"[DEBUG] Number of Songs loaded: {len(songs)}")
+
+        if config.tempo_cache_dir:
+            normalizer = TempoNormalizer(
+                config.tempo_cache_dir, config.bpm, source_bpms=config.source_bpms, num_workers=config.num_workers
+            )
+            with profiler.span("tempo_normalization", songs=len(songs)):
+                songs = normalizer.normalize(songs, profiler=profiler)
+
+        return cls(songs, store=store, analysis_cache=analysis_cache, num_workers=config.num_workers)
+
+    def stems(self, stem_types):
+        """
+        Stems of the given types, grouped by type in the order given.
+        """
+        stems = []
+        for stem_type in stem_types:
+            for song in self.songs:
+                stem = song.get_stem(stem_type)
+                if stem:
+                    stems.append(stem)
+        return stems
+
+    def analyze(self, stems, bpm, profiler=None, progress=None, cancel_token=None, beat_mode="track", analysis_sr=None,
+                features=False, song_analysis=False, per_stem_onsets=True):
+        """
+        Returns the StemAnalysis of each stem, analyzing (in parallel when num_workers > 1)
+        only the stems not analyzed with these settings yet. Progress is reported and cancellation
+        checked after every stem.
+        With song_analysis, every song with a stem to analyze is analyzed as a whole
+        (all of its stems, on one shared beat grid, see analyze_song). per_stem_onsets
+        can be turned off when no transient slicing is needed; song analysis then runs
+        onset detection once per song and grid mode uses a decimated envelope.
+        Features are not part of the settings: stems already analyzed without them only
+        get their features computed.
+        """
+        profiler = profiler or NullProfiler()
+        mix_sr = effective_analysis_sr(beat_mode, analysis_sr, per_stem_onsets)
+        settings = (bpm, beat_mode, mix_sr, song_analysis and per_stem_onsets, song_analysis)
+        job_settings = dict(
+            bpm=bpm,
+            analysis_cache=self.analysis_cache,
+            profile=not isinstance(profiler, NullProfiler),
+            beat_mode=beat_mode,
+            analysis_sr=analysis_sr,
+            features=features
+        )
+
+        pending = {stem.filepath for stem in stems if (stem.filepath, *settings) not in self._analyses}
+        if song_analysis:
+            jobs = [
+                SongAnalysisJob(stems=list(song.stems.values()), per_stem_onsets=per_stem_onsets, **job_settings)
+                for song in self.songs if any(stem.filepath in pending for stem in song.stems.values())
+            ]
+            analyzed = {stem.filepath for job in jobs for stem in job.stems}
+        else:
+            jobs = [
+                AnalysisJob(stem=stem, onsets=per_stem_onsets, **job_settings)
+                for stem in stems if stem.filepath in pending
+            ]
+            analyzed = pending
+
+        if features:
+            # stems analyzed earlier without features only need the features themselves
+            jobs += [
+                FeatureJob(
+                    stem=stem, analysis=self._analyses[(stem.filepath, *settings)], analysis_cache=self.analysis_cache,
+                    profile=job_settings["profile"], analysis_sr=mix_sr
+                )
+                for stem in stems
+                if stem.filepath not in analyzed and self._analyses[(stem.filepath, *settings)].feature_prefix is None
+            ]
+        n_stems = sum(len(job.stems) if isinstance(job, SongAnalysisJob) else 1 for job in jobs)
+
+        with profiler.span("analysis", stems=n_stems):
+            check_cancelled(cancel_token)
+            for done, (stem, analysis, spans) in enumerate(iter_stem_analyses(jobs, num_workers=self.num_workers), 1):
+                self._analyses[(stem.filepath, *settings)] = analysis
+                profiler.merge(spans)
+                report_progress(progress, done, n_stems, "analysis")
+                check_cancelled(cancel_token)
+            if jobs and self.analysis_cache is not None:
+                self.analysis_cache.evict()  # workers only see their own writes, see AnalysisCache.evict
+
+        return [self._analyses[(stem.filepath, *settings)] for stem in stems]
+
+    def segment_pool(self, config, seeds, profiler=None, progress=None, cancel_token=None):
+        """
+        All segments of the selected stem types as a SegmentTable, sliced with one
+        seed per stem. The last MAX_SEGMENT_POOLS pools are kept, so renders that only
+        differ in duration, energy target or export settings reuse them.
+
+        Returns: (segments, sample_rate, RunningEnergyStats)
+        """
+        params = slice_params(config)
+        key = (
+            config.bpm,
+            config.beat_mode,
+            config.analysis_sr,
+            needs_features(config),  # pools without features can't be ranked by similarity
+            config.song_analysis,
+            tuple(config.selected_stem_types),
+            config.selected_slicing_function,
+            tuple(sorted(params.items())),
+            tuple(seeds)
+        )
+        if key in self._pools:
+            self._pools.move_to_end(key)
+        else:
+            stems = self.stems(config.selected_stem_types)
+            analyses = self.analyze(
+                stems, config.bpm, profiler=profiler, progress=progress, cancel_token=cancel_token,
+                beat_mode=config.beat_mode, analysis_sr=config.analysis_sr, features=needs_features(config),
+                song_analysis=config.song_analysis,
+                per_stem_onsets=config.selected_slicing_function == slice_by_transients
+            )
+            self._pools[key] = build_segment_pool(
+                stems, analyses, SLICE_RANGES[config.selected_slicing_function], params, seeds,
+                profiler=profiler, progress=progress, cancel_token=cancel_token
+            )
+            while len(self._pools) > MAX_SEGMENT_POOLS:
+                self._pools.popitem(last=False)
+        return self._pools[key]
+
+    def analysis_count(self):
+        """
+        Number of stem analyses held in memory, one per stem and analysis settings.
+        """
+        return len(self._analyses)
+
+
+def slice_analysis(stem, analysis, range_function, range_params, seed):
+    """
+    Slices one analyzed stem into a SegmentTable with the segments' energies.
+    Slicing randomness comes from the stem's own seed, so results do not depend on
+    which process analyzed the stem or in which order stems finished.
+    """
+    ranges = range_function(analysis, rng=random.Random(seed), **range_params)
+
+    starts = np.array([start for start, _ in ranges], dtype=np.int64)
+    ends = np.array([end for _, end in ranges], dtype=np.int64)
+    energies = analysis.segment_energies(starts, ends)
+    features = analysis.segment_features(starts, ends)  # None unless analyzed with features
+
+    return SegmentTable.for_stem(stem, starts, ends, energies, features)
+
+
+def build_segment_pool(stems, analyses, range_function, range_params, seeds, profiler=None, progress=None, cancel_token=None):
+    """
+    Returns: (segments, sample_rate, RunningEnergyStats)
+    """
+    profiler = profiler or NullProfiler()
+    tables = []  # one SegmentTable per stem, audio is only read for the selected segments
+    sr = None  # will be set after first stem is analyzed
+    energy_stats = RunningEnergyStats()  # accumulated stem by stem
+
+    with profiler.span("slicing", stems=len(stems)):
+        for done, (stem, analysis, seed) in enumerate(zip(stems, analyses, seeds), 1):
+            check_cancelled(cancel_token)
+            if sr is None:
+                sr = analysis.sr
+            elif analysis.sr != sr:
+                raise ValueError(f"Sample rate mismatch in stem: {stem.filepath} (set stem_store_dir to resample mixed-rate libraries)")
+
+            with profiler.span("slice_stem", stem=stem.filepath):
+                segments = slice_analysis(stem, analysis, range_function, range_params, seed)
+            tables.append(segments)
+            energy_stats.update(segments.energy)
+            report_progress(progress, done, len(stems), "slicing")
+
+    return SegmentTable.concatenate(tables), sr, energy_stats
+
+
+def select_segments(segments, config, sr, rng, energy_stats=None, profiler=None):
+    """
+    Shuffles a SegmentTable pool, applies the energy filter and cuts the result to the
+    exact target duration. The pool itself is left untouched.
+    """
+    segments = shuffle_and_filter(segments, config, rng, energy_stats, profiler=profiler)
+
+    # Select segments up to exact target duration, audio is only read while exporting
+    target_samples = int(config.target_duration * sr)
+    if config.selection_mode == "similar":
+        # enough nearest segments to fill the duration even if they are all the shortest
+        shortest = max(int(segments.rows["length"].min()), 1)
+        segments = order_by_similarity(segments, k=-(-target_samples // shortest), profiler=profiler)
+    return segments.select_up_to_duration(target_samples)
+
+
+def order_by_similarity(segments, k=None, profiler=None):
+    """
+    Orders a shuffled pool by timbral similarity (MFCC, chroma, centroid) to its first
+    segment, which is a random one. Only the k nearest are kept when k is given.
+    """
+    profiler = profiler or NullProfiler()
+    seed_segment = segments[0]
+    print(f"[INFO] Selecting segments similar to {seed_segment.stem.song_name} "
+          f"({seed_segment.stem.stem_type.value}) at {seed_segment.start}")
+    with profiler.span("similarity", segments=len(segments)):
+        return segments.nearest(segments.features[0], k=k)
+
+
+def shuffle_and_filter(segments, config, rng, energy_stats=None, profiler=None):
+    """
+    The pool in random order, energy-filtered when the config asks for it.
+    Raises ValueError when nothing is left to select from.
+    """
+    profiler = profiler or NullProfiler()
+
+    if len(segments) == 0:
+        raise ValueError("No valid segments found for selected stem types.")
+
+    segments = segments.shuffled(rng)
+
+    if config.filter_by_energy:
+        with profiler.span("energy_filtering", segments=len(segments)):
+            segments = filter_segments_by_energy(
+                segments=segments,
+                target=config.energy_target,
+                scores=segments.energy,
+                stats=energy_stats
+            )
+        if len(segments) == 0:
+            raise ValueError("No segments left after energy filtering.")
+    return segments
+
+
+def export_selection(selected_segments, config, sr, output_path, suffix="", progress=None, cancel_token=None):
+    """
+    Writes the selection either as one concatenated Frankenstem or as individual fragments.
+    suffix is appended to the file or folder name, e.g. to tell batch variations apart.
+
+    Returns the path of the written file or fragment folder.
+    """
+    timestamp = datetime.now().strftime("%m%d_%H%M")
+
+    # exporting fragments individually
+    if config.export_fragments_individually:
+        fragment_folder = os.path.join(output_path, f"fragments_{timestamp}{suffix}")
+        fragment_paths = write_fragments(
+            fragment_folder, selected_segments, sr,
+            format=config.output_format,
+            subtype=config.output_subtype,
+            num_threads=config.export_threads,
+            progress=progress,
+            cancel_token=cancel_token
+        )
+
+        if config.fragment_index:
+            index_path = os.path.join(fragment_folder, f"index.{config.fragment_index}")
+            write_fragment_index(index_path, fragment_paths, selected_segments, sr)
+
+        if config.write_manifest:
+            write_manifest(os.path.join(fragment_folder, "manifest.json"), selected_segments, config, sr, fragment_folder)
+
+        print(f"[INFO] Saved {len(selected_segments)} fragments to {fragment_folder}")
+        return fragment_folder
+
+    #exporting as a single concatenated Frankenstem, streamed block by block
+    # Filename logic
+    stem_names = "_".join(stem_type.name.capitalize() for stem_type in config.selected_stem_types)
+    slice_type_name = (
+        "Transient" if config.selected_slicing_function == slice_by_transients else
+        "Beat" if config.selected_slicing_function == slice_into_random_beats else
+        "UnknownSliceType"
+    )
+    duration_str = f"{int(config.target_duration)}s"
+
+    output_file = f"{output_path}/{stem_names}_{slice_type_name}_{duration_str}_{timestamp}{suffix}.{config.output_format}"
+
+    write_segments(
+        output_file, selected_segments, sr, subtype=config.output_subtype, progress=progress, cancel_token=cancel_token
+    )
+    if config.write_manifest:
+        write_manifest(os.path.splitext(output_file)[0] + ".json", selected_segments, config, sr, output_file)
+    print(f"Saved Frankenstem to {output_file}")
+    return output_file
+
+
+def render(library, config, output_path="output", suffix="", profiler=None, progress=None, cancel_token=None):
+    """
+    Renders one Frankenstem from an already loaded StemLibrary.
+    progress(done, total, stage) is called as stems are analyzed and sliced and as
+    segments are exported; cancel_token (a CancellationToken) aborts the render with
+    GenerationCancelled between stems and segments.
+
+    Returns the path of the written file or fragment folder.
+    """
+    profiler = profiler or NullProfiler()
+    os.makedirs(output_path, exist_ok=True)
+
+    with profiler.span("render", suffix=suffix):
+        rng = random.Random(config.seed)
+        seeds = [rng.getrandbits(64) for _ in library.stems(config.selected_stem_types)]
+        segments, sr, energy_stats = library.segment_pool(
+            config, seeds, profiler=profiler, progress=progress, cancel_token=cancel_token
+        )
+
+        with profiler.span("selection", segments=len(segments)):
+            selected_segments = select_segments(segments, config, sr, rng, energy_stats, profiler=profiler)
+
+        with profiler.span("export", segments=len(selected_segments)):
+            return export_selection(
+                selected_segments, config, sr, output_path, suffix=suffix, progress=progress, cancel_token=cancel_token
+            )
+
+
+def stream_render(library, config, block_size=DEFAULT_BLOCK_SIZE, open_ended=False, profiler=None):
+    """
+    Like render, but instead of writing a file returns the Frankenstem as a generator
+    of float32 blocks of block_size frames (channel-first, 1-D when every stem is mono;
+    the last block of a finite stream may be shorter). Analysis and slicing run before
+    this returns; audio is only read as blocks are consumed, one segment range at a
+    time, so memory stays bounded by the block size whatever the duration.
+
+    With open_ended, target_duration is ignored and the stream never ends: whenever the
+    pool runs out it is reshuffled and drawn from again. Otherwise the stream holds the
+    same audio a render with this config and seed would write.
+
+    Returns: (sample_rate, channels, block generator)
+    """
+    rng = random.Random(config.seed)
+    seeds = [rng.getrandbits(64) for _ in library.stems(config.selected_stem_types)]
+    segments, sr, energy_stats = library.segment_pool(config, seeds, profiler=profiler)
+    pool = shuffle_and_filter(segments, config, rng, energy_stats, profiler=profiler)
+    if config.selection_mode == "similar":
+        pool = order_by_similarity(pool, profiler=profiler)
+
+    channels = max(stem.load_info().channels for stem in pool.stems)
+    target_samples = None if open_ended else int(config.target_duration * sr)
+    blocks = _iter_blocks(_iter_pool(pool, config, rng, target_samples), channels, block_size)
+    return sr, channels, blocks
+
+
+def _iter_pool(pool, config, rng, target_samples=None):
+    """
+    SegmentDescriptors from the pool up to target_samples (trimming the last one), or
+    forever when target_samples is None, reshuffling (and with similarity selection,
+    reordering around a new seed segment) each time the pool runs out.
+    """
+    if target_samples is not None:
+        yield from pool.select_up_to_duration(target_samples)
+        return
+
+    while True:
+        yield from pool
+        pool = pool.shuffled(rng)
+        if config.selection_mode == "similar":
+            pool = order_by_similarity(pool)
+
+
+def _iter_blocks(segments, channels, block_size):
+    """
+    Packs the audio of segments into fixed-size blocks.
+    """
+    block = np.zeros((channels, block_size), dtype=np.float32)
+    filled = 0
+    for segment in segments:
+        for chunk in segment.stem.iter_blocks(segment.start, segment.end, block_size):
+            if chunk.ndim == 1:
+                chunk = chunk[np.newaxis, :]  # broadcast over the channels of a mono stem
+            while chunk.shape[-1] > 0:
+                n = min(block_size - filled, chunk.shape[-1])
+                block[:, filled:filled + n] = chunk[:, :n]
+                filled += n
+                chunk = chunk[:, n:]
+                if filled == block_size:
+                    yield block[0] if channels == 1 else block
+                    block = np.zeros((channels, block_size), dtype=np.float32)
+                    filled = 0
+
+    if filled:
+        yield block[0, :filled] if channels == 1 else block[:, :filled]
+
+
+def render_batch(configs, input_path="input", output_path="output", profiler=None, progress=None, cancel_token=None):
+    """
+    Renders one Frankenstem per config from a single folder scan and analysis pass.
+    Library-level settings (caches, stem store, workers, tempo normalization) come from the first config.
+
+    Returns the list of written paths, in config order.
+    """
+    if not configs:
+        return []
+
+    library = StemLibrary.from_folder(input_path, configs[0], profiler=profiler)
+    return render_variations(library, configs, output_path, profiler=profiler, progress=progress, cancel_token=cancel_token)
+
+
+def render_variations(library, configs, output_path="output", profiler=None, progress=None, cancel_token=None):
+    """
+    Renders one Frankenstem per config from an already loaded StemLibrary, suffixing
+    each output with its variation number.
+
+    Returns the list of written paths, in config order.
+    """
+    outputs = []
+    for i, config in enumerate(configs):
+        print(f"[INFO] Rendering variation {i + 1} of {len(configs)}")
+        outputs.append(render(
+            library, config, output_path, suffix=f"_v{i + 1:03d}", profiler=profiler,
+            progress=progress, cancel_token=cancel_token
+        ))
+    return outputs
@@ -0,0 +1,41 @@
+import threading
+
+
+class GenerationCancelled(Exception):
+    """
+    Raised inside generate_frankenstem when its CancellationToken is cancelled.
+    """
+
+
+class CancellationToken:
+    """
+    Thread-safe flag for aborting a running generation. The pipeline checks it
+    between stems and between exported segments.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise GenerationCancelled("Generation was cancelled.")
+
+
+def check_cancelled(cancel_token):
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+
+def report_progress(progress, done, total, stage):
+    """
+    Calls progress(done, total, stage) if a progress callback was given.
+    """
+    if progress is not None:
+        progress(done, total, stage)
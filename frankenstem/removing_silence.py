@@ -1,8 +1,7 @@
-import librosa
 import numpy as np
-import random
+from frankenstem.analysis import analyze_stem
 
-def remove_silence(audio, sr, bpm, silence_thresh_db=-40):
+def remove_silence(audio, sr, bpm, silence_thresh_db=-40, cache=None, analysis=None, beat_mode="track", analysis_sr=None):
     """
     Remove silence from the audio signal using beat-aligned chunking.
 
@@ -11,58 +10,30 @@ def remove_silence(audio, sr, bpm, silence_thresh_db=-40):
     - sr: sample rate
     - bpm: tempo for beat tracking
     - silence_thresh_db: threshold in dB below which to consider silence
+    - cache: optional FileAnalysisCache for the source file, reuses a previous analysis
+    - analysis: optional StemAnalysis already computed for this audio
+    - beat_mode: "track" for librosa beat tracking, "grid" for a fixed grid at bpm
+    - analysis_sr: optional lower rate for beat detection, silence is still measured at full rate
 
     Returns:
     - np.ndarray of audio with silence removed, preserves stereo if input is stereo
     """
 
-    # Create mono mix for beat tracking
-    if audio.ndim == 2:
-        analysis_audio = np.mean(audio, axis=0)
-    else:
-        analysis_audio = audio
-
-    tempo, beat_frames = librosa.beat.beat_track(y=analysis_audio, sr=sr, bpm=bpm, units='frames')
-    beat_boundaries = librosa.frames_to_samples(beat_frames)
-
-    clean_audio = []
-    subwindow_size = int(sr * 0.1)  # 100 ms subwindows
+    if analysis is None:
+        analysis = analyze_stem(
+            audio, sr, bpm, silence_thresh_db=silence_thresh_db, cache=cache, beat_mode=beat_mode, analysis_sr=analysis_sr
+        )
 
-    i = 0
-    while i < len(beat_boundaries) - 1:
-        start = beat_boundaries[i]
-        end = beat_boundaries[i + 1]
-
-        # Slice original audio preserving stereo
-        if audio.ndim == 2:
-            segment = audio[:, start:end]
-            subwindows = [segment[:, j:j + subwindow_size] for j in range(0, segment.shape[1], subwindow_size)]
-            peak_amplitudes = [np.max(np.abs(subwindow)) for subwindow in subwindows if subwindow.shape[1] > 0]
-        else:
-            segment = audio[start:end]
-            subwindows = [segment[j:j + subwindow_size] for j in range(0, len(segment), subwindow_size)]
-            peak_amplitudes = [np.max(np.abs(subwindow)) for subwindow in subwindows if len(subwindow) > 0]
+    spans = analysis.non_silent_spans
 
-        # Compute peak dB safely
-        if peak_amplitudes:
-            peak_db = 20 * np.log10(np.max(peak_amplitudes) + 1e-6)  # avoid log(0)
-        else:
-            peak_db = -np.inf
-
-        if peak_db > silence_thresh_db:
-            clean_audio.append(segment)
-
-        i += 1
-
-    if clean_audio:
+    if len(spans) > 0:
         # Concatenate along time axis
         if audio.ndim == 2:
-            return np.concatenate(clean_audio, axis=1)
+            return np.concatenate([audio[:, start:end] for start, end in spans], axis=1)
         else:
-            return np.concatenate(clean_audio)
+            return np.concatenate([audio[start:end] for start, end in spans])
     else:
         print("[WARNING] Silence removal returned empty output.")
         return np.zeros((audio.shape[0], 0)) if audio.ndim == 2 else np.array([])
 
    
-
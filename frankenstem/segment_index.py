@@ -0,0 +1,180 @@
+from dataclasses import dataclass, replace
+import numpy as np
+from frankenstem.classes import Stem, StemType
+
+STEM_TYPE_CODES = {stem_type: code for code, stem_type in enumerate(StemType)}
+
+SEGMENT_DTYPE = np.dtype([
+    ("stem_id", np.int32),  # index into SegmentTable.stems
+    ("start", np.int64),
+    ("end", np.int64),
+    ("length", np.int64),
+    ("energy", np.float64),  # NaN when unknown
+    ("stem_type", np.int8)  # STEM_TYPE_CODES
+])
+
+
+@dataclass(frozen=True)
+class SegmentDescriptor:
+    """
+    A segment as a sample range of a source stem, read from disk only once it is selected.
+    """
+    stem: Stem
+    start: int
+    end: int
+    energy: float | None = None
+
+    @property
+    def length(self):
+        return self.end - self.start
+
+
+class SegmentTable:
+    """
+    Columnar store of segments: one row of SEGMENT_DTYPE per segment plus the list of
+    source stems the rows point into, and optionally a contiguous float32 feature
+    matrix with one row per segment. Shuffling, filtering, similarity ordering and
+    duration cuts are vectorized over the rows; indexing with an int gives a
+    SegmentDescriptor, and iterating yields SegmentDescriptors, so exporters and
+    manifests take either.
+    """
+
+    def __init__(self, stems, rows=None, features=None):
+        self.stems = list(stems)
+        self.rows = np.zeros(0, dtype=SEGMENT_DTYPE) if rows is None else rows
+        self.features = features  # (len(rows), n_features) float32, or None
+
+    @classmethod
+    def for_stem(cls, stem, starts, ends, energies=None, features=None):
+        rows = np.zeros(len(starts), dtype=SEGMENT_DTYPE)
+        rows["start"] = starts
+        rows["end"] = ends
+        rows["length"] = rows["end"] - rows["start"]
+        rows["energy"] = np.nan if energies is None else energies
+        rows["stem_type"] = STEM_TYPE_CODES[stem.stem_type]
+        return cls([stem], rows, features)
+
+    @classmethod
+    def concatenate(cls, tables):
+        """
+        One table with the rows of all tables in order, stem ids renumbered.
+        Features are kept only if every table has them.
+        """
+        stems = []
+        parts = []
+        for table in tables:
+            rows = table.rows.copy()
+            rows["stem_id"] += len(stems)
+            stems.extend(table.stems)
+            parts.append(rows)
+
+        features = None
+        if tables and all(table.features is not None for table in tables):
+            features = np.ascontiguousarray(np.concatenate([table.features for table in tables]), dtype=np.float32)
+        return cls(stems, np.concatenate(parts) if parts else None, features)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        for i in range(len(self.rows)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        """
+        An int gives a SegmentDescriptor; a slice, index array or bool mask gives a
+        SegmentTable sharing the same stems.
+        """
+        if isinstance(index, (int, np.integer)):
+            row = self.rows[index]
+            energy = float(row["energy"])
+            return SegmentDescriptor(
+                self.stems[row["stem_id"]], int(row["start"]), int(row["end"]), None if np.isnan(energy) else energy
+            )
+        return SegmentTable(self.stems, self.rows[index], None if self.features is None else self.features[index])
+
+    @property
+    def energy(self):
+        return self.rows["energy"]
+
+    @property
+    def total_length(self):
+        return int(self.rows["length"].sum())
+
+    def shuffled(self, rng):
+        """
+        Rows in random order, drawn from rng (a random.Random) so seeded renders stay reproducible.
+        """
+        order = np.random.default_rng(rng.getrandbits(64)).permutation(len(self.rows))
+        return self[order]
+
+    def nearest(self, query, k=None):
+        """
+        Rows ordered by distance to query (a feature vector, e.g. self.features[i]),
+        nearest first. Features are standardized per column over this table, so
+        MFCCs, chroma and centroid weigh alike. With k only the k nearest rows are
+        returned, found with argpartition instead of a full sort.
+        """
+        if self.features is None:
+            raise ValueError("SegmentTable has no features; analyze with features enabled.")
+
+        scale = self.features.std(axis=0)
+        scale[scale == 0] = 1.0
+        difference = (self.features - query) / scale  # same as the difference of the standardized values
+        distances = np.einsum("ij,ij->i", difference, difference)
+
+        if k is not None and k < len(distances):
+            candidates = np.argpartition(distances, k)[:k]
+            order = candidates[np.argsort(distances[candidates], kind="stable")]
+        else:
+            order = np.argsort(distances, kind="stable")
+        return self[order]
+
+    def of_types(self, stem_types):
+        codes = [STEM_TYPE_CODES[stem_type] for stem_type in stem_types]
+        return self[np.isin(self.rows["stem_type"], codes)]
+
+    def select_up_to_duration(self, target_samples):
+        """
+        Vectorized select_up_to_duration: the leading rows whose lengths fit in
+        target_samples, found with a cumulative sum and searchsorted, plus the next
+        row trimmed to fill the remainder.
+        """
+        cumulative = np.cumsum(self.rows["length"])
+        n_whole = int(np.searchsorted(cumulative, target_samples, side="right"))
+        rows = self.rows[:n_whole]
+
+        n_selected = n_whole
+        remaining = target_samples - (int(cumulative[n_whole - 1]) if n_whole else 0)
+        if n_whole < len(self.rows) and remaining > 0:
+            trimmed = self.rows[n_whole:n_whole + 1].copy()
+            trimmed["end"] = trimmed["start"] + remaining
+            trimmed["length"] = remaining
+            rows = np.concatenate([rows, trimmed])
+            n_selected += 1
+
+        return SegmentTable(self.stems, rows, None if self.features is None else self.features[:n_selected])
+
+
+def select_up_to_duration(descriptors, target_samples):
+    """
+    Takes descriptors in order until target_samples is reached, trimming the last one
+    so the selection adds up to exactly target_samples (or less, if the pool runs out).
+    A SegmentTable is cut with its vectorized counterpart.
+    """
+    if isinstance(descriptors, SegmentTable):
+        return descriptors.select_up_to_duration(target_samples)
+
+    selected = []
+    cumulative_samples = 0
+
+    for descriptor in descriptors:
+        if cumulative_samples + descriptor.length > target_samples:
+            remaining_samples = target_samples - cumulative_samples
+            if remaining_samples > 0:
+                selected.append(replace(descriptor, end=descriptor.start + remaining_samples))
+            break
+        selected.append(descriptor)
+        cumulative_samples += descriptor.length
+
+    return selected
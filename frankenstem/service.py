@@ -0,0 +1,147 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+import traceback
+import urllib.error
+import urllib.request
+from frankenstem.jobs import expand_job
+from frankenstem.pipeline import StemLibrary, render_variations
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def library_key(input_path, config):
+    """
+    The folder plus the library-level settings of config; renders with the same key
+    can share one StemLibrary.
+    """
+    return (
+        os.path.abspath(input_path), config.stem_store_dir, config.sample_rate, config.analysis_cache_dir,
+        config.analysis_cache_max_mb, config.feature_cache_max_mb, config.num_workers, config.catalog_path,
+        config.audio_cache_mb, config.audio_cache_dtype, config.tempo_cache_dir, json.dumps(config.source_bpms, sort_keys=True),
+        config.bpm if config.tempo_cache_dir else None  # stems are stretched to the target tempo
+    )
+
+
+class RenderService:
+    """
+    Keeps StemLibraries (folder scan, analyses, segment pools and, with audio_cache_mb,
+    decoded audio) in memory between jobs, so only the first job for a folder pays for
+    scanning and analysis. Jobs use the batch job format (see load_job_file) and are
+    rendered one at a time.
+    """
+
+    def __init__(self):
+        self.libraries = {}  # library_key -> StemLibrary
+        self.jobs_done = 0
+        self._lock = threading.Lock()
+
+    def submit(self, job):
+        """
+        Renders a parsed job. With "rescan": true the folder is scanned and analyzed
+        again, e.g. after stems were added or changed.
+
+        Returns the list of written paths, in config order.
+        """
+        input_path, output_path, configs = expand_job(job)
+        if not configs:
+            return []
+
+        with self._lock:
+            key = library_key(input_path, configs[0])
+            if job.get("rescan") or key not in self.libraries:
+                self.libraries[key] = StemLibrary.from_folder(input_path, configs[0])
+            outputs = render_variations(self.libraries[key], configs, output_path)
+            self.jobs_done += 1
+        return outputs
+
+    def status(self):
+        with self._lock:
+            return {
+                "libraries": [
+                    {"input_path": key[0], "songs": len(library.songs), "analyses": library.analysis_count()}
+                    for key, library in self.libraries.items()
+                ],
+                "jobs_done": self.jobs_done
+            }
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    service = None  # set by serve
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._reply(200, self.service.status())
+        else:
+            self._reply(404, {"error": f"Unknown path '{self.path}'"})
+
+    def do_POST(self):
+        if self.path == "/shutdown":
+            self._reply(200, {"shutting_down": True})
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        if self.path != "/render":
+            self._reply(404, {"error": f"Unknown path '{self.path}'"})
+            return
+
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            self._reply(200, {"outputs": self.service.submit(job)})
+        except (ValueError, KeyError, TypeError, FileNotFoundError) as e:  # bad job or config
+            self._reply(400, {"error": str(e)})
+        except Exception as e:
+            traceback.print_exc()
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        print(f"[INFO] {self.address_string()} {format % args}")
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, service=None):
+    """
+    Runs a RenderService behind a local HTTP endpoint until POST /shutdown (or Ctrl+C):
+        POST /render    job JSON -> {"outputs": [...]}
+        GET /status     loaded libraries and jobs done
+        POST /shutdown
+    Binds to localhost only by default; paths in jobs are read on the server's side.
+    """
+    handler = type("RequestHandler", (_RequestHandler,), {"service": service or RenderService()})
+    with ThreadingHTTPServer((host, port), handler) as server:
+        print(f"[INFO] Frankenstem service listening on http://{host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def submit_job(job, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=None):
+    """
+    Sends a job to a running service and waits for it to finish. Relative input and
+    output paths are resolved against the current directory first.
+
+    Returns the list of written paths.
+    """
+    job = dict(job)
+    job["input_path"] = os.path.abspath(job.get("input_path", "input"))
+    job["output_path"] = os.path.abspath(job.get("output_path", "output"))
+    request = urllib.request.Request(
+        f"http://{host}:{port}/render", data=json.dumps(job).encode(),
+        headers={"Content-Type": "application/json"}, method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())["outputs"]
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"Render failed: {json.loads(e.read()).get('error')}") from None
+    except urllib.error.URLError as e:
+        raise RuntimeError(f"No Frankenstem service at {host}:{port} (start one with main.py --serve): {e.reason}") from None
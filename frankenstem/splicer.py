@@ -1,84 +1,85 @@
-import librosa
 import numpy as np
-from frankenstem.removing_silence import remove_silence
+from frankenstem.analysis import analyze_stem
 import random
 
-def slice_into_random_beats(audio, sr, bpm, min_beats=8, max_beats=10):
+def slice_into_random_beats(audio, sr, bpm, min_beats=8, max_beats=10, cache=None, analysis=None, rng=None, beat_mode="track",
+                            analysis_sr=None):
     """
     Splice an audio signal into random beat-length segments using beat tracking.
     Works with mono or stereo, returns stereo if input is stereo. 
+    Pass a FileAnalysisCache as cache to reuse beat tracking results across runs,
+    or a StemAnalysis already computed for this audio.
+    beat_mode="grid" places beats on a fixed grid at bpm instead of tracking them, and
+    analysis_sr runs the analysis on a decimated mono copy (cuts stay sample-accurate).
     """
 
-    # Remove silence BEFORE analysis for stability
-    audio = remove_silence(audio, sr, bpm)
+    if analysis is None:
+        analysis = analyze_stem(audio, sr, bpm, cache=cache, beat_mode=beat_mode, analysis_sr=analysis_sr)
 
-    # If stereo, create mono mix for beat analysis
-    if audio.ndim == 2:
-        analysis_audio = np.mean(audio, axis=0)
-    else:
-        analysis_audio = audio
+    return [audio[..., start:end] for start, end in beat_slice_ranges(analysis, min_beats, max_beats, rng=rng)]
 
-    tempo, beat_frames = librosa.beat.beat_track(y=analysis_audio, sr=sr, bpm=bpm, units='frames')
-    beat_boundaries = librosa.frames_to_samples(beat_frames)
 
-    segments = []
-    i = 0
+def beat_slice_ranges(analysis, min_beats=8, max_beats=10, rng=None):
+    """
+    Picks random beat-length (start, end) sample ranges from a StemAnalysis.
+    Silent beats are skipped, so ranges never span a removed silence.
+    Beat counts are drawn from rng (a random.Random), or the global random module.
+    """
 
-    while i < len(beat_boundaries) - min_beats:
-        n_beats = random.randint(min_beats, max_beats)
-        start = beat_boundaries[i]
-        end = beat_boundaries[min(i + n_beats, len(beat_boundaries) - 1)]
+    rng = rng or random
+    ranges = []
 
-        if audio.ndim == 2:
-            segment = audio[:, start:end]  # preserve stereo
-        else:
-            segment = audio[start:end]
+    for beat_boundaries in analysis.non_silent_runs():
+        i = 0
 
-        segments.append(segment)
-        i += n_beats
+        while i < len(beat_boundaries) - min_beats:
+            n_beats = rng.randint(min_beats, max_beats)
+            start = beat_boundaries[i]
+            end = beat_boundaries[min(i + n_beats, len(beat_boundaries) - 1)]
 
-    return segments
+            ranges.append((start, end))
+            i += n_beats
 
+    return ranges
 
-def slice_by_transients(audio, sr, bpm, delta=0.05, min_length_seconds=0.5, hop_length=512, backtrack=True):
+
+def slice_by_transients(audio, sr, bpm, delta=0.05, min_length_seconds=0.5, hop_length=512, backtrack=True, cache=None, analysis=None,
+                        beat_mode="track", analysis_sr=None):
     """
     Splits audio at transient (onset) points using librosa's onset detection.
     Works with mono or stereo, returns stereo if input is stereo.
+    Pass a FileAnalysisCache as cache to reuse onset detection results across runs,
+    or a StemAnalysis already computed for this audio.
     """
 
-    # Remove silence
-    audio = remove_silence(audio, sr, bpm)
-
-    # If stereo, create mono mix for onset detection
-    if audio.ndim == 2:
-        analysis_audio = np.mean(audio, axis=0)
-    else:
-        analysis_audio = audio
+    if analysis is None:
+        analysis = analyze_stem(
+            audio, sr, bpm, hop_length=hop_length, cache=cache, beat_mode=beat_mode, analysis_sr=analysis_sr
+        )
 
-    onset_frames = librosa.onset.onset_detect(
-        y=analysis_audio,
-        sr=sr,
-        hop_length=hop_length,
-        backtrack=backtrack,
-        delta=delta
-    )
-    onset_samples = librosa.frames_to_samples(onset_frames, hop_length=hop_length)
-    onset_samples = np.append(onset_samples, len(analysis_audio))
+    ranges = transient_slice_ranges(analysis, delta=delta, min_length_seconds=min_length_seconds, backtrack=backtrack)
+    return [audio[..., start:end] for start, end in ranges]
 
-    min_length_samples = int(min_length_seconds * sr)
-    segments = []
 
-    for start, end in zip(onset_samples[:-1], onset_samples[1:]):
-        if (end - start) >= min_length_samples:
-            if audio.ndim == 2:
-                segment = audio[:, start:end]  # preserve stereo
-            else:
-                segment = audio[start:end]
-            segments.append(segment)
-
-    return segments
+def transient_slice_ranges(analysis, delta=0.05, min_length_seconds=0.5, backtrack=True, rng=None):
+    """
+    Picks (start, end) sample ranges between consecutive onsets of a StemAnalysis.
+    Silent beats are skipped, so ranges never span a removed silence.
+    Transient slicing is deterministic; rng is only accepted to match beat_slice_ranges.
+    """
 
+    onset_samples = analysis.onset_samples(delta=delta, backtrack=backtrack)
+    min_length_samples = int(min_length_seconds * analysis.sr)
+    ranges = []
 
+    for beat_boundaries in analysis.non_silent_runs():
+        run_start, run_end = beat_boundaries[0], beat_boundaries[-1]
+        inside = onset_samples[(onset_samples >= run_start) & (onset_samples < run_end)]
+        boundaries = np.append(inside, run_end)
 
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            if (end - start) >= min_length_samples:
+                ranges.append((start, end))
 
+    return ranges
 
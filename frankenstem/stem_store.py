@@ -0,0 +1,90 @@
+from collections import Counter
+import hashlib
+import math
+import os
+import numpy as np
+from frankenstem.audio_io import AudioInfo, audio_info
+from frankenstem.file_utils import atomic_write, file_signature
+
+
+class StemStore:
+    """
+    Directory of pre-decoded stems: each source file is decoded once into a float32,
+    channel-first .npy at the store's sample rate, then memory-mapped on every later load,
+    so only the regions that are actually sliced get paged in.
+
+    Stems recorded at another rate are resampled once into their own cached copy,
+    which lets libraries with mixed sample rates be used together.
+    """
+
+    def __init__(self, store_dir, sample_rate=None):
+        self.store_dir = str(store_dir)
+        self.sample_rate = sample_rate  # None: chosen by harmonize()
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def harmonize(self, stems):
+        """
+        Picks the most common native sample rate of stems as the store's rate, reading headers only.
+        Does nothing if a sample rate was already set.
+        """
+        if self.sample_rate is not None or not stems:
+            return self.sample_rate
+
+        rates = Counter(audio_info(stem.filepath).samplerate for stem in stems)
+        self.sample_rate = max(rates, key=lambda rate: (rates[rate], rate))
+        return self.sample_rate
+
+    def _entry_path(self, filepath):
+        signature = f"{file_signature(filepath)}:{self.sample_rate}"
+        return os.path.join(self.store_dir, hashlib.sha1(signature.encode("utf-8")).hexdigest() + ".npy")
+
+    def import_stem(self, filepath):
+        """
+        Decodes filepath into the store unless an up-to-date copy is already there.
+
+        Returns: path of the stored .npy
+        """
+        if self.sample_rate is None:
+            raise ValueError("StemStore needs a sample_rate; set one or call harmonize() first.")
+
+        path = self._entry_path(filepath)
+        if os.path.exists(path):
+            return path
+
+        import librosa
+        audio, _ = librosa.load(filepath, sr=self.sample_rate, mono=False)
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+
+        with atomic_write(path) as f:  # safe with several processes importing at once
+            np.save(f, audio)
+        return path
+
+    def import_stems(self, stems):
+        for stem in stems:
+            self.import_stem(stem.filepath)
+
+    def load(self, filepath):
+        """
+        Returns: (read-only memory-mapped audio, sample_rate)
+        """
+        return np.load(self.import_stem(filepath), mmap_mode='r'), self.sample_rate
+
+    def info(self, filepath):
+        """
+        AudioInfo of the stored copy without decoding anything: the .npy header if the
+        stem was imported already, the source header at the store's rate otherwise.
+        """
+        if self.sample_rate is None:
+            raise ValueError("StemStore needs a sample_rate; set one or call harmonize() first.")
+
+        path = self._entry_path(filepath)
+        if os.path.exists(path):
+            audio = np.load(path, mmap_mode='r')
+            channels = 1 if audio.ndim == 1 else audio.shape[0]
+            return AudioInfo(self.sample_rate, audio.shape[-1], channels)
+
+        source = audio_info(filepath)
+        # the length librosa.resample gives on import, float ratio included
+        frames = source.frames if source.samplerate == self.sample_rate else \
+            math.ceil(source.frames * (float(self.sample_rate) / source.samplerate))
+        return AudioInfo(self.sample_rate, frames, source.channels)
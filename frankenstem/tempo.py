@@ -0,0 +1,196 @@
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import math
+import os
+import numpy as np
+import soundfile as sf
+from frankenstem.classes import Song, Stem
+from frankenstem.file_utils import atomic_write, file_signature
+from frankenstem.instrumentation import NullProfiler
+
+DETECTION_SR = 22050
+STRETCH_TOLERANCE = 1e-3  # songs within 0.1% of the target tempo are used as they are
+
+
+class TempoNormalizer:
+    """
+    Time-stretches every stem of a library to target_bpm before analysis, so songs at
+    different tempos can be mixed. Each song's source tempo is taken from source_bpms
+    (song name -> BPM) or detected once from the sum of its stems and kept in a small
+    JSON file per song. Stretched copies are
+    kept in cache_dir as float WAVs keyed by source file, source BPM and target BPM, so
+    each stretch only runs once per tempo pair. Detection and stretching are spread over
+    num_workers processes.
+    """
+
+    def __init__(self, cache_dir, target_bpm, source_bpms=None, num_workers=1):
+        self.cache_dir = str(cache_dir)
+        self.target_bpm = target_bpm
+        self.source_bpms = dict(source_bpms or {})
+        self.num_workers = num_workers
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def normalize(self, songs, profiler=None):
+        """
+        Returns: list of Songs whose Stems point at copies at target_bpm (or at the
+        original files for songs already at target_bpm)
+        """
+        profiler = profiler or NullProfiler()
+
+        with profiler.span("tempo_detection"):
+            tempos = self.source_tempos(songs)
+
+        jobs = []
+        for song in songs:
+            rate = self.target_bpm / tempos[song.name]
+            if abs(rate - 1) < STRETCH_TOLERANCE:
+                continue
+            for stem in song.stems.values():
+                path = self._entry_path(stem.filepath, tempos[song.name])
+                if not os.path.exists(path):
+                    jobs.append((stem.filepath, path, rate))
+
+        with profiler.span("time_stretch", stems=len(jobs)):
+            if jobs:
+                print(f"[INFO] Time-stretching {len(jobs)} stems to {self.target_bpm} BPM")
+            for _ in _map(_stretch_job, jobs, self.num_workers):
+                pass
+
+        normalized = []
+        for song in songs:
+            tempo = tempos[song.name]
+            stretched = abs(self.target_bpm / tempo - 1) >= STRETCH_TOLERANCE
+            print(f"[DEBUG] {song.name}: {tempo:.2f} BPM" + (f" -> {self.target_bpm} BPM" if stretched else ""))
+            new_song = Song(song.name)
+            for stem in song.stems.values():
+                filepath = self._entry_path(stem.filepath, tempo) if stretched else stem.filepath
+                new_song.add_stem(Stem(
+                    stem.song_name, stem.stem_type, filepath, store=stem.store, audio_cache=stem.audio_cache
+                ))
+            normalized.append(new_song)
+        return normalized
+
+    def source_tempos(self, songs):
+        """
+        Source tempo per song name: given in source_bpms, or detected (and remembered in
+        the cache directory, keyed by the song's files). Detected tempos are folded by
+        octaves towards target_bpm, so a half- or double-time detection is not stretched
+        by a factor of two.
+        """
+        tempos = {}
+        to_detect = []
+        for song in songs:
+            if song.name in self.source_bpms:
+                tempos[song.name] = float(self.source_bpms[song.name])
+            else:
+                key = _song_signature(song)
+                tempo = self._load_detected(key)
+                if tempo is not None:
+                    tempos[song.name] = tempo
+                else:
+                    to_detect.append((song, key))
+
+        if to_detect:
+            print(f"[INFO] Detecting the tempo of {len(to_detect)} songs")
+            filepaths = [[stem.filepath for stem in song.stems.values()] for song, _ in to_detect]
+            for (song, key), tempo in zip(to_detect, _map(detect_tempo, filepaths, self.num_workers)):
+                self._save_detected(key, tempo)
+                tempos[song.name] = tempo
+
+        return {
+            name: tempo if name in self.source_bpms else fold_tempo(tempo, self.target_bpm)
+            for name, tempo in tempos.items()
+        }
+
+    def _entry_path(self, filepath, source_bpm):
+        signature = f"{file_signature(filepath)}:{source_bpm:.3f}:{self.target_bpm:.3f}"
+        return os.path.join(self.cache_dir, hashlib.sha1(signature.encode("utf-8")).hexdigest() + ".wav")
+
+    def _tempo_path(self, song_key):
+        return os.path.join(self.cache_dir, f"{song_key}.tempo.json")
+
+    def _load_detected(self, song_key):
+        try:
+            with open(self._tempo_path(song_key)) as f:
+                return float(json.load(f)["bpm"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_detected(self, song_key, tempo):
+        # one file per song, so processes detecting different songs never overwrite each other
+        with atomic_write(self._tempo_path(song_key), "w") as f:
+            json.dump({"bpm": tempo}, f)
+
+
+def detect_tempo(filepaths, sr=DETECTION_SR, hop_length=512):
+    """
+    Estimates the tempo (BPM) of a song from the mono sum of its stems.
+    """
+    import librosa
+    mix = np.zeros(0, dtype=np.float32)
+    for filepath in filepaths:
+        audio, _ = librosa.load(filepath, sr=sr, mono=True)
+        if len(audio) > len(mix):
+            audio[:len(mix)] += mix
+            mix = audio
+        else:
+            mix[:len(audio)] += audio
+
+    onset_envelope = librosa.onset.onset_strength(y=mix, sr=sr, hop_length=hop_length)
+    tempo = float(librosa.feature.tempo(onset_envelope=onset_envelope, sr=sr, hop_length=hop_length)[0])
+
+    # the tempogram only resolves a few percent; refine with a line fit through the
+    # tracked beat times, numbering beats by the median spacing so skipped beats don't count
+    _, beat_times = librosa.beat.beat_track(
+        onset_envelope=onset_envelope, sr=sr, hop_length=hop_length, bpm=tempo, units="time"
+    )
+    if len(beat_times) >= 8:
+        intervals = np.diff(beat_times)
+        beat_numbers = np.concatenate([[0], np.cumsum(np.round(intervals / np.median(intervals)))])
+        tempo = 60 / np.polyfit(beat_numbers, beat_times, 1)[0]
+    return float(tempo)
+
+
+def fold_tempo(tempo, target_bpm):
+    """
+    Halves or doubles tempo until it is within a factor of sqrt(2) of target_bpm.
+    """
+    while tempo > target_bpm * math.sqrt(2):
+        tempo /= 2
+    while tempo < target_bpm / math.sqrt(2):
+        tempo *= 2
+    return tempo
+
+
+def stretch_file(source_path, output_path, rate):
+    """
+    Writes source_path time-stretched by rate (> 1 is faster) to output_path as a
+    float WAV at the source's sample rate, via a temporary file so a partial write is
+    never mistaken for a finished copy.
+    """
+    import librosa
+    audio, sr = librosa.load(source_path, sr=None, mono=False)
+    stretched = librosa.effects.time_stretch(audio, rate=rate)
+
+    with atomic_write(output_path) as f:  # safe with several processes stretching at once
+        sf.write(f, stretched.T if stretched.ndim == 2 else stretched, sr, format="WAV", subtype="FLOAT")
+    return output_path
+
+
+def _stretch_job(job):
+    return stretch_file(*job)
+
+
+def _map(function, items, num_workers):
+    if num_workers <= 1 or len(items) <= 1:
+        return list(map(function, items))
+    with ProcessPoolExecutor(max_workers=min(num_workers, len(items))) as executor:
+        return list(executor.map(function, items))
+
+
+def _song_signature(song):
+    digest = hashlib.sha1()
+    for signature in sorted(file_signature(stem.filepath) for stem in song.stems.values()):
+        digest.update(signature.encode("utf-8"))
+    return digest.hexdigest()
@@ -1,14 +1,41 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 from tkinter import filedialog
+from contextlib import redirect_stdout
 import os
+import queue
+import threading
 
 
 from frankenstem.classes import StemType
 from frankenstem.splicer import slice_into_random_beats, slice_by_transients
 from frankenstem.config import FrankenstemConfig
+from frankenstem.progress import CancellationToken, GenerationCancelled
 from main import generate_frankenstem
 
+POLL_INTERVAL_MS = 100
+
+
+class QueueWriter:
+    """
+    File-like object passing printed lines to the GUI thread through a queue.
+    """
+
+    def __init__(self, messages):
+        self.messages = messages
+        self._buffer = ""
+
+    def write(self, text):
+        self._buffer += text
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            self.messages.put(("log", line))
+
+    def flush(self):
+        if self._buffer:
+            self.messages.put(("log", self._buffer))
+            self._buffer = ""
+
 
 class FrankenstemGUI(tk.Tk):
     def __init__(self):
@@ -24,6 +51,10 @@ class FrankenstemGUI(tk.Tk):
         }
 
 
+        self.messages = queue.Queue()  # filled by the worker thread, drained on the Tk thread
+        self.worker = None
+        self.cancel_token = None
+
         self.create_widgets()
 
 
@@ -109,9 +140,18 @@ class FrankenstemGUI(tk.Tk):
         # Buttons
         btn_frame = tk.Frame(self)
         btn_frame.pack(pady=10)
-        tk.Button(btn_frame, text="Generate Frankenstem", command=self.run_generation, font=font_code).pack(side='left', padx=5)
+        self.generate_button = tk.Button(btn_frame, text="Generate Frankenstem", command=self.run_generation, font=font_code)
+        self.generate_button.pack(side='left', padx=5)
+        self.cancel_button = tk.Button(btn_frame, text="Cancel", command=self.cancel_generation, font=font_code, state='disabled')
+        self.cancel_button.pack(side='left', padx=5)
         tk.Button(btn_frame, text="Exit", command=self.quit, font=font_code).pack(side='left', padx=5)
 
+        # Progress
+        self.stage_var = tk.StringVar(value="Idle")
+        tk.Label(self, textvariable=self.stage_var, font=font_code).pack()
+        self.progress_bar = ttk.Progressbar(self, length=500, mode='determinate')
+        self.progress_bar.pack(pady=(5, 0))
+
         # Output Box
         self.output = scrolledtext.ScrolledText(self, width=80, height=20, font=("Courier New", 10))
         self.output.pack(pady=(10, 0))
@@ -179,14 +219,81 @@ class FrankenstemGUI(tk.Tk):
 
             self.log(f"[INFO] Generating Frankenstem with BPM={bpm}, Duration={duration}s, "
                      f"Stems={[s.name for s in selected_stems]}, Slicer={self.slicer_combo.get()}")
+        except Exception as e:
+            self.log(f"[ERROR] {e}")
+            return
+
+        # generation runs on a worker thread so the window stays responsive
+        self.cancel_token = CancellationToken()
+        self.worker = threading.Thread(
+            target=self.generation_worker,
+            args=(config, input_path, output_path, self.cancel_token),
+            daemon=True
+        )
+        self.generate_button.config(state='disabled')
+        self.cancel_button.config(state='normal')
+        self.progress_bar['value'] = 0
+        self.stage_var.set("Starting")
+        self.worker.start()
+        self.after(POLL_INTERVAL_MS, self.poll_messages)
+
+    def generation_worker(self, config, input_path, output_path, cancel_token):
+        """
+        Runs on the worker thread, never touches Tk widgets: prints, progress and the
+        outcome all go through self.messages.
+        """
+        def progress(done, total, stage):
+            self.messages.put(("progress", (done, total, stage)))
+
+        writer = QueueWriter(self.messages)
+        try:
+            with redirect_stdout(writer):
+                generate_frankenstem(
+                    config, input_path=input_path, output_path=output_path,
+                    progress=progress, cancel_token=cancel_token
+                )
+            writer.flush()
+            self.messages.put(("done", "[INFO] Frankenstem generation complete.\n"))
+        except GenerationCancelled:
+            writer.flush()
+            self.messages.put(("done", "[INFO] Frankenstem generation cancelled.\n"))
+        except Exception as e:
+            writer.flush()
+            self.messages.put(("done", f"[ERROR] {e}"))
+
+    def poll_messages(self):
+        while True:
+            try:
+                kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "log":
+                self.log(payload)
+            elif kind == "progress":
+                done, total, stage = payload
+                self.progress_bar['maximum'] = max(total, 1)
+                self.progress_bar['value'] = done
+                self.stage_var.set(f"{stage.capitalize()}: {done}/{total}")
+            elif kind == "done":
+                self.log(payload)
+                self.finish_generation()
+                return
 
+        self.after(POLL_INTERVAL_MS, self.poll_messages)
 
-            generate_frankenstem(config, input_path=input_path, output_path=output_path)
-
+    def cancel_generation(self):
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+            self.stage_var.set("Cancelling...")
+            self.cancel_button.config(state='disabled')
 
-            self.log("[INFO] Frankenstem generation complete.\n")
-        except Exception as e:
-            self.log(f"[ERROR] {e}")
+    def finish_generation(self):
+        self.worker = None
+        self.cancel_token = None
+        self.generate_button.config(state='normal')
+        self.cancel_button.config(state='disabled')
+        self.stage_var.set("Idle")
 
 
 def main():